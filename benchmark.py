@@ -0,0 +1,244 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List
+
+from lark import Lark
+
+from dbms import DBMS
+from run import build_parser, load_parser, parse_query, execute_statement
+from sql_transformer import SQLTransformer
+
+
+PARSE_QUERIES = [
+    "create table account (account_number char(10) not null, branch_name char(15), balance int, "
+    "primary key (account_number), foreign key (branch_name) references branch (branch_name));",
+    "insert into account values ('A-101', 'Downtown', 500);",
+    "insert into account values ('A-101', 'Downtown', 500), ('A-102', 'Perryridge', 400), ('A-201', 'Brighton', 900);",
+    "select customer_name, borrower.loan_number, amount from borrower, loan "
+    "where borrower.loan_number = loan.loan_number and branch_name = 'Perryridge';",
+    "delete from account where branch_name = 'Perryridge' and balance < 1000;",
+]
+
+SIZES = [1000, 10000, 100000]  # rows of the customer, account and depositor tables
+BRANCH_COUNT = 50
+POINT_SELECTS = 1000
+TOLERANCE = 0.2  # a throughput lower, or a p99 latency higher, than the baseline by more than this is a regression
+
+BANK_SCHEMA = [
+    "create table branch (branch_name char(15), branch_city char(30), assets int, primary key (branch_name));",
+    "create table customer (customer_name char(20), customer_street char(30), customer_city char(30), primary key (customer_name));",
+    "create table account (account_number char(10), branch_name char(15), balance int, primary key (account_number), "
+    "foreign key (branch_name) references branch (branch_name));",
+    "create table depositor (customer_name char(20), account_number char(10), primary key (customer_name, account_number), "
+    "foreign key (customer_name) references customer (customer_name), foreign key (account_number) references account (account_number));",
+]
+
+
+def time_calls(function: Callable, repeat: int) -> List[float]:
+    """Return the wall time of each of `repeat` calls, in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def percentile(times: List[float], fraction: float) -> float:
+    ordered = sorted(times)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def bench_parser(repeat: int):
+    """Compare the Earley parser built on every launch with a separate transform, as run.py did before, to the cached LALR parser."""
+    with open("grammar.lark") as file:
+        grammar = file.read()
+    earley_parser = Lark(grammar, start="command", lexer="basic")
+    sql_parser = build_parser()  # also writes the cache, if no run did before
+
+    def parse_earley():
+        for query in PARSE_QUERIES:
+            SQLTransformer().transform(earley_parser.parse(query))
+
+    def parse_lalr():
+        for query in PARSE_QUERIES:
+            parse_query(sql_parser, query)
+
+    results = [
+        ("build parser (earley)", time_calls(lambda: Lark(grammar, start="command", lexer="basic"), repeat)),
+        ("build parser (cached lalr)", time_calls(build_parser, repeat)),
+        ("parse statement (earley)", [elapsed / len(PARSE_QUERIES) for elapsed in time_calls(parse_earley, repeat)]),
+        ("parse statement (lalr)", [elapsed / len(PARSE_QUERIES) for elapsed in time_calls(parse_lalr, repeat)]),
+    ]
+    print("{:<30}{:>12}{:>12}".format("benchmark", "median ms", "min ms"))
+    for name, times in results:
+        print("{:<30}{:>12.3f}{:>12.3f}".format(name, statistics.median(times), min(times)))
+
+
+class Workload:
+    """Runs the statements of one benchmark case on a DBMS and records the latency of each one.
+
+    Statements are parsed before they are timed, so only the DBMS is measured.
+    """
+    def __init__(self, dbms):
+        self.dbms = dbms
+        self.times = []
+
+    def run(self, query: str):
+        parsed_query = parse_query(load_parser(), query)
+        self.time(execute_statement, self.dbms, parsed_query)
+
+    def time(self, function: Callable, *args):
+        start = time.perf_counter()
+        function(*args)
+        self.times.append((time.perf_counter() - start) * 1000)
+
+    def result(self, elapsed: float) -> dict:
+        return {
+            "operations": len(self.times),
+            "throughput": len(self.times) / elapsed,  # operations per second
+            "p50_ms": percentile(self.times, 0.5),
+            "p99_ms": percentile(self.times, 0.99),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+
+def peak_rss_mb() -> float:
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss / (1024 * 1024) if sys.platform == "darwin" else peak_rss / 1024  # bytes on macOS, kilobytes elsewhere
+
+
+def bench_bank(size: int, sync: bool) -> Dict[str, dict]:
+    """Run every case on a bank database of `size` customers, accounts and deposits, in a new DB directory.
+
+    Runs in a process of its own, so the peak RSS of each size is measured separately.
+    """
+    load_parser()  # reads grammar.lark before leaving the working directory
+    with tempfile.TemporaryDirectory(prefix="dbms-benchmark-") as db_parent_dir:
+        os.chdir(db_parent_dir)
+        return run_bank_cases(DBMS(sync=sync), size)
+
+
+def run_bank_cases(dbms: DBMS, size: int) -> Dict[str, dict]:
+    rng = random.Random(size)
+    branches = [f"Branch {i}" for i in range(BRANCH_COUNT)]
+    customers = [f"Customer {i:07d}" for i in range(size)]
+    accounts = [f"A-{i:07d}" for i in range(size)]
+
+    def insert(table_name, values):
+        return lambda: dbms.insert({"table_name": table_name, "column_name_list": None}, values)
+
+    def create(workload):
+        for query in BANK_SCHEMA:
+            workload.run(query)
+
+    def insert_rows(workload):
+        for branch in branches:
+            workload.time(insert("branch", [branch, rng.choice(["Brooklyn", "Horseneck", "Palo Alto"]), rng.randrange(10 ** 6)]))
+        for customer in customers:
+            workload.time(insert("customer", [customer, f"{rng.randrange(1000)} Main", rng.choice(["Harrison", "Rye", "Stamford"])]))
+
+    def insert_referencing_rows(workload):
+        for account in accounts:
+            workload.time(insert("account", [account, rng.choice(branches), rng.randrange(10000)]))
+        for customer, account in zip(customers, rng.sample(accounts, len(accounts))):
+            workload.time(insert("depositor", [customer, account]))
+
+    def select_points(workload):
+        for customer in rng.sample(customers, min(POINT_SELECTS, size)):
+            workload.run(f"select * from customer where customer_name = '{customer}';")
+
+    def select_filtered(workload):
+        for branch in branches[:10]:
+            workload.run(f"select account_number, balance from account where branch_name = '{branch}' and balance > 5000;")
+
+    def select_joined(workload):
+        for branch in branches[:5]:
+            workload.run("select customer.customer_name, account.account_number, balance from customer, depositor, account "
+                         "where customer.customer_name = depositor.customer_name and depositor.account_number = account.account_number "
+                         f"and branch_name = '{branch}';")
+
+    def delete(workload):
+        for table_name, keys, column_name in (("depositor", customers, "customer_name"), ("account", accounts, "account_number")):
+            for i in range(1, 11):
+                workload.run(f"delete from {table_name} where {column_name} <= '{keys[size * i // 10 - 1]}';")  # a tenth of the rows
+
+    def drop(workload):
+        for table_name in ("depositor", "account", "customer", "branch"):
+            workload.run(f"drop table {table_name};")
+
+    cases = [("create", create), ("insert", insert_rows), ("insert fk", insert_referencing_rows), ("select point", select_points),
+             ("select filter", select_filtered), ("select join", select_joined), ("delete", delete), ("drop", drop)]
+    results = {}
+    try:
+        for name, case in cases:
+            workload = Workload(dbms)
+            start = time.perf_counter()
+            case(workload)
+            results[f"{name}/{size}"] = workload.result(time.perf_counter() - start)
+    finally:
+        dbms.close()
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict]) -> Dict[str, str]:
+    """Return how each result compares with the baseline: throughput and p99 latency ratios, flagged if they regressed."""
+    comparison = {}
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        throughput_ratio = result["throughput"] / baseline[name]["throughput"]
+        latency_ratio = result["p99_ms"] / baseline[name]["p99_ms"] if baseline[name]["p99_ms"] else 1.0
+        regressed = throughput_ratio < 1 - TOLERANCE or latency_ratio > 1 + TOLERANCE
+        comparison[name] = f"{throughput_ratio:.2f}x ops, {latency_ratio:.2f}x p99" + (" REGRESSION" if regressed else "")
+    return comparison
+
+
+def print_results(results: Dict[str, dict], comparison: Dict[str, str]):
+    print("{:<22}{:>10}{:>12}{:>10}{:>10}{:>10}  {}".format("benchmark", "ops", "ops/s", "p50 ms", "p99 ms", "rss MB", "vs baseline"))
+    for name, result in results.items():
+        print("{:<22}{:>10}{:>12.1f}{:>10.3f}{:>10.3f}{:>10.1f}  {}".format(
+            name, result["operations"], result["throughput"], result["p50_ms"], result["p99_ms"], result["peak_rss_mb"], comparison.get(name, "")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the cost of the operations of the DBMS.")
+    parser.add_argument("suite", choices=["parser", "bank"])
+    parser.add_argument("--repeat", type=int, default=20, help="runs of each parser benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="rows of the bank tables")
+    parser.add_argument("--sync", action="store_true", help="wait for the disk on every commit, as run.py does by default")
+    parser.add_argument("--baseline", help="JSON file of earlier results to compare with")
+    parser.add_argument("--save", help="JSON file to write the results to, e.g. as a new baseline")
+    args = parser.parse_args()
+
+    if args.suite == "parser":
+        bench_parser(args.repeat)
+        return
+
+    results = {}
+    for size in args.sizes:
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results.update(pool.submit(bench_bank, size, args.sync).result())
+    comparison = {}
+    if args.baseline:
+        with open(args.baseline) as file:
+            comparison = compare(results, json.load(file))
+    print_results(results, comparison)
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+    if any(value.endswith("REGRESSION") for value in comparison.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+from typing import Callable, Dict, Iterator, List, Set, Tuple
+
+from db_model import Table
+from utils import *
+from messages import *
+
+
+# Compiled predicates take a row tuple and return True, False or UNKNOWN.
+Predicate = Callable[[tuple], object]
+
+
+# ------------------------------ column layout ------------------------------- #
+
+def build_layout(table_list: List[Table]) -> Dict[Tuple[str, str], int]:
+    """Map (table_name, column_name) to its position in a row made by concatenating the tables' columns."""
+    layout = {}
+    for table in table_list:
+        for column_name in table.columns:
+            layout.setdefault((table.table_name, column_name), len(layout))
+    return layout
+
+
+def resolve_column(table_name: str, column_name: str, table_list: List[Table]) -> Table:
+    """Return the table that owns the column referenced in a where clause."""
+    if table_name and not any([table_name == table.table_name for table in table_list]):
+        raise WhereTableNotSpecified()
+    found_tables = [table for table in table_list if column_name in table]
+    if len(found_tables) < 1:
+        raise WhereColumnNotExist()
+    elif len(found_tables) > 1:
+        if not table_name:  # column name is ambiguous
+            raise WhereAmbiguousReference()
+        table = next(table for table in found_tables if table_name == table.table_name)
+    else:
+        table = found_tables[0]
+    if table_name and table_name != table.table_name:
+        raise WhereColumnNotExist()
+    return table
+
+
+def resolve_aggregate(aggregate: tuple, table_list: List[Table]) -> Tuple[str, str, str]:
+    """Return (function, table_name, column_name) of an aggregate with its column resolved; count(*) has no column."""
+    function, table_name, column_name = aggregate
+    if column_name is None:
+        return function, None, None
+    return function, resolve_column(table_name, column_name, table_list).table_name, column_name
+
+
+def aggregate_value_types(aggregate: Tuple[str, str, str], table_list: List[Table]) -> Set[str]:
+    """Return the possible value types of a resolved aggregate: those of its column for min and max, otherwise int."""
+    function, table_name, column_name = aggregate
+    if function in ("min", "max"):
+        table = next(table for table in table_list if table.table_name == table_name)
+        return column_value_types(table.columns[column_name])
+    return {"int"}
+
+
+# -------------------------------- compilation ------------------------------- #
+
+def compile_condition(condition: dict, table_list: List[Table], layout: Dict[Tuple[str, str], int]=None) -> Predicate:
+    """Compile a where clause from SQLTransformer into a predicate over row tuples.
+
+    Column references are resolved against `table_list` once, so name resolution errors are raised here
+    instead of while scanning. `layout` defaults to the concatenation of the columns of `table_list`.
+    A having clause is compiled over grouped rows, whose layout also maps resolved aggregates.
+    """
+    if layout is None:
+        layout = build_layout(table_list)
+    return _compile(condition, table_list, layout)
+
+
+def _compile(condition, table_list, layout):
+    op = condition["op"]
+    if op in comparison_op_map | null_op_map:
+        return _compile_predicate(condition, table_list, layout)
+
+    elif op == "not":
+        boolean_test = _compile(condition["boolean_test"], table_list, layout)
+        return lambda row: not_(boolean_test(row))
+
+    elif op == "and":
+        boolean_factors = [_compile(boolean_factor, table_list, layout) for boolean_factor in condition["boolean_factors"]]
+        return lambda row: and_(*[boolean_factor(row) for boolean_factor in boolean_factors])
+
+    elif op == "or":
+        boolean_terms = [_compile(boolean_term, table_list, layout) for boolean_term in condition["boolean_terms"]]
+        return lambda row: or_(*[boolean_term(row) for boolean_term in boolean_terms])
+
+    else:  # None
+        remaining_condition = list(condition.values())[-1]  # "boolean_terms", "boolean_factors", "boolean_test"
+        if remaining_condition is None:
+            return lambda row: None
+        return _compile(remaining_condition, table_list, layout)
+
+
+def _compile_operand(operand, table_list, layout):
+    """Return (position, constant, possible value types) of an operand; position is None for constants."""
+    if operand is None:
+        return None, None, None
+    elif len(operand) == 1:  # comparable_value
+        value = operand[0]
+        return None, value, {infer_type(value)}
+    elif len(operand) == 3:  # function, table_name, column_name
+        aggregate = resolve_aggregate(operand, table_list)
+        if aggregate not in layout:  # not a having clause
+            raise WhereAggregateError()
+        return layout[aggregate], None, aggregate_value_types(aggregate, table_list)
+    else:  # table_name, column_name
+        table_name, column_name = operand
+        table = resolve_column(table_name, column_name, table_list)
+        return layout[(table.table_name, column_name)], None, column_value_types(table.columns[column_name])
+
+
+def _compile_predicate(condition, table_list, layout):
+    op, left_operand, right_operand = map(condition.get, ["op", "left_operand", "right_operand"])
+    left_position, left_constant, left_types = _compile_operand(left_operand, table_list, layout)
+    right_position, right_constant, right_types = _compile_operand(right_operand, table_list, layout)
+
+    if op in null_op_map:  # left operand is always a column
+        null_op = null_op_map[op]
+        return lambda row: null_op(row[left_position], None)
+
+    compare = comparison_op_map[op]
+    if left_types is not None and right_types is not None and None not in left_types | right_types:
+        if not left_types & right_types:
+            raise WhereIncomparableError()
+        # char columns may hold date-like strings, so those are still checked per value
+        check_values = len(left_types | right_types) > 1
+    else:
+        check_values = False
+
+    if left_position is not None and right_position is None and not check_values:
+        if right_constant is None:
+            return lambda row: UNKNOWN
+        def predicate(row):
+            left_value = row[left_position]
+            if left_value is None:
+                return UNKNOWN
+            return compare(left_value, right_constant)
+        return predicate
+
+    get_left = (lambda row: row[left_position]) if left_position is not None else (lambda row: left_constant)
+    get_right = (lambda row: row[right_position]) if right_position is not None else (lambda row: right_constant)
+    def predicate(row):
+        left_value = get_left(row)
+        right_value = get_right(row)
+        if check_values and is_comparable(left_value, right_value) == False:
+            raise WhereIncomparableError()
+        if left_value is None or right_value is None:
+            return UNKNOWN
+        return compare(left_value, right_value)
+    return predicate
+
+
+# ------------------------------- conjunctions ------------------------------- #
+
+def split_conjuncts(condition: dict) -> List[dict]:
+    """Split a where clause into the conditions of its top-level AND; a row satisfies it only if it satisfies all of them."""
+    op = condition["op"]
+    if op == "and":
+        return [conjunct for boolean_factor in condition["boolean_factors"] for conjunct in split_conjuncts(boolean_factor)]
+    elif op is None:
+        remaining_condition = list(condition.values())[-1]
+        return split_conjuncts(remaining_condition) if remaining_condition is not None else []
+    return [condition]
+
+
+def compile_conjuncts(conjuncts: List[dict], table_list: List[Table], layout: Dict[Tuple[str, str], int]) -> Predicate:
+    """Compile conjuncts into one predicate that is True only if every conjunct is True."""
+    predicates = [_compile(conjunct, table_list, layout) for conjunct in conjuncts]
+    if len(predicates) == 1:
+        return predicates[0]
+    # every conjunct is evaluated, as `and_` does, so incomparable values are reported whatever the order of the conjuncts
+    return lambda row: all([predicate(row) == True for predicate in predicates])
+
+
+def condition_operands(condition: dict) -> Iterator[tuple]:
+    """Yield the operands of every comparison and null predicate of a condition."""
+    op = condition["op"]
+    if op in comparison_op_map | null_op_map:
+        for operand in (condition["left_operand"], condition["right_operand"]):
+            if operand is not None:
+                yield operand
+    elif op == "not":
+        yield from condition_operands(condition["boolean_test"])
+    elif op == "and":
+        for boolean_factor in condition["boolean_factors"]:
+            yield from condition_operands(boolean_factor)
+    elif op == "or":
+        for boolean_term in condition["boolean_terms"]:
+            yield from condition_operands(boolean_term)
+    else:
+        remaining_condition = list(condition.values())[-1]
+        if remaining_condition is not None:
+            yield from condition_operands(remaining_condition)
+
+
+def referenced_columns(condition: dict, table_list: List[Table]) -> List[Tuple[str, str]]:
+    """Return the resolved (table_name, column_name) of every column the condition references."""
+    return [(resolve_column(table_name, column_name, table_list).table_name, column_name)
+            for table_name, column_name in (operand for operand in condition_operands(condition) if len(operand) == 2)]
+
+
+def referenced_aggregates(condition: dict, table_list: List[Table]) -> List[Tuple[str, str, str]]:
+    """Return the resolved (function, table_name, column_name) of every aggregate the condition references."""
+    return [resolve_aggregate(operand, table_list) for operand in condition_operands(condition) if len(operand) == 3]
+
+
+def equi_join_columns(conjunct: dict, table_list: List[Table]) -> Tuple[Tuple[str, str], Tuple[str, str]]:
+    """Return the two resolved columns of a `column = column` conjunct between different tables, otherwise None."""
+    if conjunct["op"] != "=":
+        return None
+    left_operand, right_operand = conjunct["left_operand"], conjunct["right_operand"]
+    if len(left_operand) != 2 or len(right_operand) != 2:
+        return None
+    left_column, right_column = referenced_columns(conjunct, table_list)
+    if left_column[0] == right_column[0]:
+        return None
+    return left_column, right_column
+
+
+FLIPPED_OPS = {'<': '>', '<=': '>=', '>': '<', '>=': '<=', '=': '=', '!=': '!='}
+
+def column_comparison(conjunct: dict, table_list: List[Table]) -> Tuple[Tuple[str, str], str, object]:
+    """Return (resolved column, op, constant) of a `column op constant` conjunct, with the column moved to the left."""
+    if conjunct["op"] not in comparison_op_map:
+        return None
+    op, left_operand, right_operand = conjunct["op"], conjunct["left_operand"], conjunct["right_operand"]
+    if len(left_operand) == 1 and len(right_operand) == 2:  # constant op column
+        op, left_operand, right_operand = FLIPPED_OPS[op], right_operand, left_operand
+    if len(left_operand) != 2 or len(right_operand) != 1:
+        return None
+    table_name, column_name = left_operand
+    return (resolve_column(table_name, column_name, table_list).table_name, column_name), op, right_operand[0]
@@ -1,6 +1,7 @@
-from collections import defaultdict
 import pickle  # handle complex data types and tuples as dict keys
-from typing import Dict, Set, Tuple
+import struct
+import threading
+from typing import Dict, Iterable, List, Set, Tuple
 from pathlib import Path
 from uuid import uuid4
 
@@ -27,14 +28,18 @@ class Table(DataObject):
         not_null_keys: Set[str], 
         primary_key: Tuple[str], 
         foreign_keys: Dict[str, Tuple[str, str]],
-        referenced_by: Set[str]=set()
+        referenced_by: Set[str]=None,
+        indexes: Dict[str, Tuple[str]]=None,
+        statistics: "TableStatistics"=None
     ):
         self.table_name = table_name
         self.columns = columns  # key: column name, value: column referencing_type
         self.not_null_keys = not_null_keys  # set of column names
         self.primary_key = primary_key  # tuple of column names (order is important in this project)
         self.foreign_keys = foreign_keys  # key: referencing column name, value: tuple of (referenced table name, referenced column name)
-        self.referenced_by = referenced_by  # set of table names that reference this table
+        self.referenced_by = referenced_by if referenced_by is not None else set()  # set of table names that reference this table
+        self.indexes = indexes if indexes is not None else dict()  # key: index name, value: tuple of indexed column names
+        self.statistics = statistics  # collected by ANALYZE TABLE, None if it never ran
         
     def __str__(self):
         info = "\n-----------------------------------------------------------------\n"
@@ -75,6 +80,16 @@ class Table(DataObject):
         
     def remove_reference(self, table_name):
         self.referenced_by.remove(table_name)
+        
+    def add_index(self, index_name, column_names):
+        self.indexes[index_name] = tuple(column_names)
+        
+    def remove_index(self, index_name):
+        del self.indexes[index_name]
+        
+    def find_index(self, column_name):
+        """Return the name of an index whose first column is the column, or None."""
+        return next((index_name for index_name, column_names in self.indexes.items() if column_names[0] == column_name), None)
     
 '''
 table = TableSchema(
@@ -94,28 +109,53 @@ table = TableSchema(
 '''
         
 
-class Record(DataObject):
+class ColumnStatistics:
+    """Summary of the values of one column, used to estimate how many rows a condition keeps."""
+    def __init__(self, distinct_count: int, null_count: int, min_value, max_value):
+        self.distinct_count = distinct_count  # of non-null values
+        self.null_count = null_count
+        self.min_value = min_value  # None if every value is null
+        self.max_value = max_value
+
+
+class TableStatistics:
+    """Row count and column statistics of a table, as of the last ANALYZE TABLE. They are not updated by later writes."""
+    def __init__(self, row_count: int, columns: Dict[str, ColumnStatistics]):
+        self.row_count = row_count
+        self.columns = columns  # key: column name
+    
+    @classmethod
+    def collect(cls, table: Table, rows: Iterable[tuple]):
+        """Compute the statistics of a table from all of its rows, in column order."""
+        distinct_values = [set() for _ in table.columns]
+        null_counts = [0] * len(table.columns)
+        row_count = 0
+        for row in rows:
+            row_count += 1
+            for i, value in enumerate(row):
+                if value is None:
+                    null_counts[i] += 1
+                else:
+                    distinct_values[i].add(value)
+        columns = {}
+        for column_name, values, null_count in zip(table.columns, distinct_values, null_counts):
+            columns[column_name] = ColumnStatistics(len(values), null_count, min(values, default=None), max(values, default=None))
+        return cls(row_count, columns)
+        
+
+class Record:
     def __init__(
         self, 
         table_name: str, 
         data: Dict, 
         primary_value: Tuple,
-        referencing: Dict[Tuple, Set],
-        referenced_by=defaultdict(set)
+        referencing: Dict[Tuple, Set]
     ):
         self.table_name = table_name
         self.data = data
         self.primary_value = primary_value
         self.referencing = referencing  # {(referenced table_name, referenced column): {referenced value...}} 
-        self.referenced_by = referenced_by  # {(referencing table_name, referencing column): {referencing value...}}
-
-    def add_to_referenced_by(self, referencing_table, referencing_column, referencing_value):
-        self.referenced_by[(referencing_table, referencing_column)].add(referencing_value)
-        
-    def remove_referenced_by(self, referencing_table, referencing_column, referencing_value):
-        self.referenced_by[(referencing_table, referencing_column)].remove(referencing_value)
-        if len(self.referenced_by[(referencing_table, referencing_column)]) == 0:
-            del self.referenced_by[(referencing_table, referencing_column)]
+        # the records referencing this one are kept in the ReferenceDB of the table
         
         
         
@@ -132,25 +172,167 @@ row = TableRow(
 )
 '''
 
+def encode_key_value(kind: str, value) -> bytes:
+    """Encode a primary key value so that the byte order of the keys is the order of the values.
+
+    int: big-endian with the sign bit flipped, date: yyyymmdd as big-endian uint32,
+    char: utf-8 bytes with 0x00 escaped as 0x00 0xff and terminated by 0x00 0x01, so that no key is a prefix of another.
+    """
+    if kind == "int":
+        return struct.pack(">Q", value + 2**63)
+    elif kind == "date":
+        return struct.pack(">I", int(value[0:4]) * 10000 + int(value[5:7]) * 100 + int(value[8:10]))
+    else:
+        return value.encode().replace(b"\x00", b"\x00\xff") + b"\x00\x01"
+
+
+class RowCodec:
+    """Schema-driven binary encoding of the values of a record.
+
+    Layout: null bitmap | one fixed-width field per column | bytes of the char values
+    The fixed-width field holds the value of an int column (int64) or a date column (yyyymmdd as uint32),
+    and the byte length of the value of a char column. Column names come from the `Table` schema.
+    """
+    def __init__(self, table: Table):
+        self.column_names = list(table.columns)
+        self.kinds = [data_type if data_type in ("int", "date") else "char" for data_type in table.columns.values()]
+        self.char_positions = [i for i, kind in enumerate(self.kinds) if kind == "char"]
+        self.bitmap_size = (len(self.kinds) + 7) // 8
+        self.fixed = struct.Struct(f"<{self.bitmap_size}s" + "".join("q" if kind == "int" else "I" for kind in self.kinds))
+        
+    def encode(self, values: List) -> bytes:
+        bitmap = 0
+        fields = []
+        chars = []
+        for i, (kind, value) in enumerate(zip(self.kinds, values)):
+            if value is None:
+                bitmap |= 1 << i
+                fields.append(0)
+            elif kind == "int":
+                fields.append(value)
+            elif kind == "date":
+                fields.append(int(value[0:4]) * 10000 + int(value[5:7]) * 100 + int(value[8:10]))
+            else:
+                encoded = value.encode()
+                fields.append(len(encoded))
+                chars.append(encoded)
+        return self.fixed.pack(bitmap.to_bytes(self.bitmap_size, "little"), *fields) + b"".join(chars)
+    
+    def decode(self, encoded: bytes, positions: Set[int]=None) -> tuple:
+        """Decode the values in column order; if positions are given, the other columns are left as None."""
+        fields = self.fixed.unpack_from(encoded)
+        bitmap = int.from_bytes(fields[0], "little")
+        offset = self.fixed.size
+        values = []
+        for i, kind in enumerate(self.kinds):
+            field = fields[i + 1]
+            if bitmap >> i & 1 or (positions is not None and i not in positions):
+                value = None
+            elif kind == "int":
+                value = field
+            elif kind == "date":
+                value = f"{field // 10000:04d}-{field // 100 % 100:02d}-{field % 100:02d}"
+            else:
+                value = encoded[offset:offset + field].decode()
+            if kind == "char":
+                offset += field
+            values.append(value)
+        return tuple(values)
+
+
+LOCK_TIMEOUT = 5000000  # microseconds a transaction waits for a lock held by another one
+
+
+class Environment:
+    """Transactional BerkeleyDB environment shared by the MetaDB and every table DB in the DB directory.
+
+    Every write is logged, so a statement interrupted by a crash is rolled back by recovery when the
+    environment is opened again. If `sync` is False, commits do not wait for the log to reach the disk
+    (DB_TXN_NOSYNC): a crash may lose the last transactions, but never leaves one half applied.
+    Handles are free-threaded (DB_THREAD), and the running transaction is kept per thread, so several
+    sessions can run statements at the same time. BerkeleyDB locks the pages they read and write, and
+    a transaction in a deadlock, or waiting longer than LOCK_TIMEOUT, fails instead of waiting forever.
+    Other processes join the environment with `recover` set to False, as only its first opener may run recovery.
+    """
+    def __init__(self, db_dir: Path, sync: bool=True, recover: bool=True):
+        self.db_dir = db_dir
+        self.local = threading.local()  # holds the running transaction of each thread
+        self.env = db.DBEnv()
+        self.env.set_flags(db.DB_AUTO_COMMIT, 1)  # operations outside of a statement commit on their own
+        if not sync:
+            self.env.set_flags(db.DB_TXN_NOSYNC, 1)
+        self.env.log_set_config(db.DB_LOG_AUTO_REMOVE, 1)  # log files are removed once they are checkpointed
+        self.env.set_lk_detect(db.DB_LOCK_DEFAULT)  # one transaction of a deadlock is aborted
+        self.env.set_timeout(LOCK_TIMEOUT, db.DB_SET_LOCK_TIMEOUT)
+        flags = db.DB_CREATE | db.DB_INIT_MPOOL | db.DB_INIT_LOCK | db.DB_INIT_LOG | db.DB_INIT_TXN | db.DB_THREAD
+        self.env.open(str(db_dir), flags | db.DB_RECOVER if recover else flags)
+    
+    @property
+    def txn(self):
+        """Transaction of the statement running on this thread, used by every DB operation."""
+        return getattr(self.local, "txn", None)
+    
+    @txn.setter
+    def txn(self, txn):
+        self.local.txn = txn
+        
+    def begin(self, parent=None):
+        return self.env.txn_begin(parent)
+    
+    def remove_db(self, db_name: str):
+        """Remove the file of a closed DB as part of the running transaction."""
+        if (self.db_dir / (db_name + ".db")).exists():
+            self.env.dbremove(db_name + ".db", txn=self.txn)
+            
+    def close(self):
+        self.env.txn_checkpoint()
+        self.env.close()
+
+
 class DB:
     """One database, One table"""
-    def __init__(self, db_name: str):
-        self.db_dir = Path("./DB")
+    def __init__(self, db_name: str, env: Environment):
+        self.env = env
+        self.db_dir = env.db_dir
         self.db_name = db_name
         self.db_file = self.db_dir / (self.db_name + ".db")
+        self.indexes = {}  # key: index name, value: associated IndexDB
         
     def open_db(self):
-        self.DB = db.DB()
+        self.DB = db.DB(self.env.env)
+        flags, txn = self.get_open_flags()
+        self.DB.open(self.db_file.name, dbname=self.db_name, dbtype=db.DB_BTREE, flags=flags, txn=txn)
+        
+    def get_open_flags(self):
+        """Return the flags and the transaction to open the DB file with, relative to the environment directory.
+
+        A new file is created as part of the running transaction, so a rollback removes it. An existing file
+        is opened on its own, so the handle stays valid whatever the running transaction becomes and can be
+        shared by every session.
+        """
         if self.db_file.exists():
-            self.DB.open(str(self.db_file), dbname=self.db_name, dbtype=db.DB_HASH)
-        else:
-            self.DB.open(str(self.db_file), dbname=self.db_name, dbtype=db.DB_HASH, flags=db.DB_CREATE)
+            return db.DB_THREAD | db.DB_AUTO_COMMIT, None
+        if self.env.txn is None:
+            return db.DB_THREAD | db.DB_CREATE | db.DB_AUTO_COMMIT, None
+        return db.DB_THREAD | db.DB_CREATE, self.env.txn
         
     def close_db(self):
+        for index_db in self.indexes.values():  # secondaries are closed before their primary
+            index_db.close_db()
+        self.indexes = {}
         self.DB.close()
         
+    def open_index(self, index_name: str, column_names: Tuple[str]):
+        """Open the secondary DB of an index and associate it, building its entries if the file is new."""
+        index_db = IndexDB(self, index_name, column_names)
+        flags, txn = index_db.get_open_flags()
+        index_db.open_db()
+        self.DB.associate(index_db.DB, index_db.create_index_key, flags=db.DB_CREATE | (flags & db.DB_AUTO_COMMIT), txn=txn)
+        self.indexes[index_name] = index_db
+        return index_db
+        
     def create_cursor(self):
-        return self.DB.cursor()
+        return self.DB.cursor(txn=self.env.txn)
         
     def discard_cursor(self, cursor):
         cursor.close()
@@ -159,55 +341,285 @@ class DB:
         return self.DB.get_dbname()
     
     def create_key_from_value(self, primary_tuple: tuple):  # if has primary key
-        return str(primary_tuple).encode()
+        """Encode the values of the primary key columns, or of a prefix of them, in primary key order."""
+        return b"".join(encode_key_value(kind, value) for kind, value in zip(self.key_kinds, primary_tuple))
     
     def create_random_key(self):  # if no primary key
         return uuid4().bytes
     
+    def split_keys(self, parts: int) -> List[bytes]:
+        """Return keys dividing the DB into `parts` ranges holding about as many records each.
+
+        The keys are found by bisection between the first and last keys, with DB.key_range estimating
+        the fraction of records before each probe, so no record is read.
+        """
+        cursor = self.create_cursor()
+        try:
+            first, last = cursor.first(), cursor.last()
+        finally:
+            self.discard_cursor(cursor)
+        if not first:
+            return []
+        width = max(len(first[0]), len(last[0]))  # keys are compared as integers of equal width
+        low, high = (int.from_bytes(key.ljust(width, b"\0"), "big") for key in (first[0], last[0]))
+        split_keys = []
+        for part in range(1, parts):
+            lower, upper = low, high
+            while upper - lower > max((high - low) >> 32, 1):  # stops once precise enough
+                middle = (lower + upper) // 2
+                less, _, _ = self.DB.key_range(middle.to_bytes(width, "big"), txn=self.env.txn)
+                if less < part / parts:
+                    lower = middle
+                else:
+                    upper = middle
+            split_keys.append(upper.to_bytes(width, "big"))
+        return sorted(set(split_keys))
+            
     def exists(self, key):
-        return self.DB.exists(key)
+        return self.DB.exists(key, txn=self.env.txn)
     
     def get(self, key):
-        dataobj = self.DB.get(key, default=None)
+        dataobj = self.DB.get(key, default=None, txn=self.env.txn)
         if not dataobj:
             return None
-        return Record.deserialize(dataobj)
+        return self.decode_record(dataobj)
+    
+    def get_encoded(self, key):
+        """Return the encoded record of a key without decoding it, or None."""
+        return self.DB.get(key, default=None, txn=self.env.txn)
 
     def put(self, key, dataobj):
-        self.DB.put(key, dataobj.serialize())
+        self.DB.put(key, self.codec.encode([dataobj.data[column_name] for column_name in self.codec.column_names]), txn=self.env.txn)
     
     def delete(self, key):
-        self.DB.delete(key)
+        self.DB.delete(key, txn=self.env.txn)
     
     def delete_by_cursor(self, cursor):
         cursor.delete()
         
     def keys(self):
-        return self.DB.keys()
+        return self.DB.keys(self.env.txn)
     
     def values(self):
-        return self.DB.values()
+        return self.DB.values(self.env.txn)
     
     def items(self):
-        return self.DB.items()
+        return self.DB.items(self.env.txn)
     
-    def define_meta(self, meta):
+    def define_meta(self, meta: Table):
         self.meta = meta
+        self.codec = RowCodec(meta)
+        self.key_kinds = [self.codec.kinds[self.codec.column_names.index(column_name)] for column_name in meta.primary_key or ()]
+        
+    def decode_row(self, encoded: bytes, positions: Set[int]=None) -> tuple:
+        return self.codec.decode(encoded, positions)
+    
+    def decode_record(self, encoded: bytes) -> Record:
+        data = dict(zip(self.codec.column_names, self.codec.decode(encoded)))
+        primary_value = tuple(data[column_name] for column_name in self.meta.primary_key) if self.meta.primary_key else None
+        referencing = {referenced: {data[column_name]} for column_name, referenced in self.meta.foreign_keys.items()} if self.meta.foreign_keys else dict()
+        return Record(self.meta.table_name, data, primary_value, referencing)
+        
+
+class IndexDB(DB):
+    """Secondary DB of a table, kept up to date by BerkeleyDB on every write to the table DB.
+
+    Keys are the indexed column values encoded like primary keys, so ranges of them can be scanned,
+    and values are the primary keys of the records holding them (sorted duplicates).
+    """
+    def __init__(self, table_db: DB, index_name: str, column_names: Tuple[str]):
+        super().__init__(f"{table_db.db_name}.{index_name}", table_db.env)  # stored next to the table DB
+        self.table_db = table_db
+        self.column_names = column_names
+        self.positions = [table_db.codec.column_names.index(column_name) for column_name in column_names]
+        self.key_kinds = [table_db.codec.kinds[position] for position in self.positions]
+        
+    def open_db(self):
+        self.DB = db.DB(self.env.env)
+        self.DB.set_flags(db.DB_DUP | db.DB_DUPSORT)
+        flags, txn = self.get_open_flags()
+        self.DB.open(self.db_file.name, dbname=self.db_name, dbtype=db.DB_BTREE, flags=flags, txn=txn)
+        
+    def create_index_key(self, primary_key: bytes, encoded: bytes):
+        """Callback of `associate`: the index key of an encoded record, or DB_DONOTINDEX if its first indexed value is null.
+
+        If a later indexed value is null, the key holds the values before it, so ranges over those values still
+        find the record. As the values of a key never prefix another's, it sorts before the keys extending it.
+        """
+        values = self.table_db.decode_row(encoded, set(self.positions))
+        index_values = [values[position] for position in self.positions]
+        if index_values[0] is None:  # null never satisfies a comparison
+            return db.DB_DONOTINDEX
+        if None in index_values:
+            index_values = index_values[:index_values.index(None)]
+        return self.create_key_from_value(index_values)
+    
+    def cursor_set_range(self, cursor, key):
+        """Move the cursor to the first index key not less than `key`; return (index key, primary key, encoded record) or None."""
+        return cursor.pget(key, db.DB_SET_RANGE)
+    
+    def cursor_next(self, cursor):
+        return cursor.pget(db.DB_NEXT)
+        
+
+class ReferenceDB(DB):
+    """Records referencing the records of a table: one entry per (referenced key, referencing table, referencing key).
+
+    Entries start with the key of the referenced record, so whether a record is referenced is a prefix lookup,
+    and their value is the referencing table name.
+    """
+    def __init__(self, table_name: str, env: Environment):
+        super().__init__(f"{table_name}.references", env)  # stored next to the table DB
+        
+    def create_reference_key(self, referenced_key: bytes, referencing_table_name: str, referencing_key: bytes):
+        return referenced_key + encode_key_value("char", referencing_table_name) + referencing_key
+    
+    def add_reference(self, referenced_key: bytes, referencing_table_name: str, referencing_key: bytes):
+        self.DB.put(self.create_reference_key(referenced_key, referencing_table_name, referencing_key), referencing_table_name.encode(), txn=self.env.txn)
+        
+    def remove_reference(self, referenced_key: bytes, referencing_table_name: str, referencing_key: bytes):
+        reference_key = self.create_reference_key(referenced_key, referencing_table_name, referencing_key)
+        if self.DB.exists(reference_key, txn=self.env.txn):  # a record may reference the same record through several columns
+            self.DB.delete(reference_key, txn=self.env.txn)
+            
+    def remove_references(self, referencing_table_name: str, references: List[Tuple[bytes, bytes]]):
+        """Remove the entries of (referenced key, referencing key) pairs of one referencing table, e.g. those of a DELETE."""
+        for referenced_key, referencing_key in references:
+            self.remove_reference(referenced_key, referencing_table_name, referencing_key)
+            
+    def is_referenced(self, referenced_key: bytes) -> bool:
+        cursor = self.create_cursor()
+        key_value_pair = cursor.set_range(referenced_key)
+        self.discard_cursor(cursor)
+        return bool(key_value_pair) and key_value_pair[0].startswith(referenced_key)
+    
+    def remove_referencing_table(self, referencing_table_name: str):
+        """Remove every entry of a referencing table, e.g. when it is dropped."""
+        cursor = self.create_cursor()
+        key_value_pair = cursor.first()
+        while key_value_pair:
+            if key_value_pair[1] == referencing_table_name.encode():
+                self.delete_by_cursor(cursor)
+            key_value_pair = cursor.next()
+        self.discard_cursor(cursor)
         
 
 class MetaDB(DB):
     """Metadata DB containing table schemas"""
-    def __init__(self, db_name="table"):  # identifier
-        super().__init__(db_name)
+    def __init__(self, env: Environment, db_name="table"):  # identifier
+        super().__init__(db_name, env)
     
     def get(self, key):
-        value = self.DB.get(key, default=None)
+        value = self.DB.get(key, default=None, txn=self.env.txn)
         if not value:
             return None
         return Table.deserialize(value)
     
+    def put(self, key, dataobj):
+        self.DB.put(key, dataobj.serialize(), txn=self.env.txn)
+    
     def get_db_file(self, db_name):
         return self.db_dir / (db_name + ".db")
 
     def create_key_from_value(self, table_name):
-        return table_name.encode()
\ No newline at end of file
+        return table_name.encode()
+
+class HandleManager:
+    """Opens the metadata DB and each table DB once and keeps the handles until they are closed.
+
+    The handles are shared by every session, so they are opened and closed under a lock.
+    """
+    def __init__(self, env: Environment):
+        self.env = env
+        self.meta_db = None
+        self.table_dbs = {}  # key: table name, value: opened DB
+        self.reference_dbs = {}  # key: referenced table name, value: opened ReferenceDB
+        self.lock = threading.RLock()
+        
+    def get_meta_db(self) -> MetaDB:
+        if self.meta_db is None:
+            with self.lock:
+                if self.meta_db is None:
+                    meta_db = MetaDB(self.env)
+                    meta_db.open_db()
+                    self.meta_db = meta_db
+        return self.meta_db
+    
+    def get_db(self, table: Table) -> DB:
+        table_db = self.table_dbs.get(table.table_name)
+        if table_db is not None:
+            return table_db
+        with self.lock:
+            if table.table_name not in self.table_dbs:
+                table_db = DB(table.table_name, self.env)
+                table_db.define_meta(table)  # records are encoded with the table schema
+                table_db.open_db()
+                for index_name, column_names in table.indexes.items():  # writes must go through every index
+                    table_db.open_index(index_name, column_names)
+                self.table_dbs[table.table_name] = table_db  # shared only once it is complete
+            return self.table_dbs[table.table_name]
+    
+    def get_reference_db(self, table_name: str) -> ReferenceDB:
+        reference_db = self.reference_dbs.get(table_name)
+        if reference_db is not None:
+            return reference_db
+        with self.lock:
+            if table_name not in self.reference_dbs:
+                reference_db = ReferenceDB(table_name, self.env)
+                reference_db.open_db()
+                self.reference_dbs[table_name] = reference_db
+            return self.reference_dbs[table_name]
+    
+    def close_db(self, table_name: str):
+        """Close the handles of a table, e.g. before its DB files are removed or after its creation is rolled back."""
+        with self.lock:
+            table_db = self.table_dbs.pop(table_name, None)
+            if table_db is not None:
+                table_db.close_db()
+            reference_db = self.reference_dbs.pop(table_name, None)
+            if reference_db is not None:
+                reference_db.close_db()
+            
+    def close_all(self):
+        with self.lock:
+            for table_name in set(self.table_dbs) | set(self.reference_dbs):
+                self.close_db(table_name)
+            if self.meta_db is not None:
+                self.meta_db.close_db()
+                self.meta_db = None
+
+
+
+class Catalog:
+    """In-memory cache of the table schemas stored in the MetaDB"""
+    def __init__(self, handles: HandleManager):
+        self.handles = handles
+        self.tables = {}  # key: table name, value: deserialized Table
+        
+    def get_table(self, table_name: str) -> Table:
+        """Return the schema of a table, or None if it does not exist."""
+        table = self.tables.get(table_name)
+        if table is None:
+            meta_db = self.handles.get_meta_db()
+            table = meta_db.get(meta_db.create_key_from_value(table_name))
+            if table is not None:
+                self.tables[table_name] = table
+        return table
+    
+    def put_table(self, table: Table):
+        """Write a new or updated schema through to the MetaDB."""
+        meta_db = self.handles.get_meta_db()
+        meta_db.put(meta_db.create_key_from_value(table.table_name), table)
+        self.tables[table.table_name] = table
+        
+    def delete_table(self, table_name: str):
+        meta_db = self.handles.get_meta_db()
+        meta_db.delete(meta_db.create_key_from_value(table_name))
+        self.tables.pop(table_name, None)
+        
+    def table_names(self):
+        return [table_key.decode() for table_key in self.handles.get_meta_db().keys()]
+    
+    def invalidate(self):
+        """Forget every cached schema so that they are read again from the MetaDB."""
+        self.tables.clear()
\ No newline at end of file
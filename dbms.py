@@ -1,22 +1,241 @@
 from pathlib import Path
-from typing import Dict, List
+import atexit
+import copy
+import csv
+import functools
 import itertools
-from collections import Counter
-from copy import deepcopy
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Set, Tuple
+from collections import Counter, defaultdict
 
-from db_model import Table, Record, DB, MetaDB
+from berkeleydb import db
+
+from db_model import Table, TableStatistics, Record, DB, Environment, HandleManager, Catalog, LOCK_TIMEOUT
+from condition import compile_condition, compile_conjuncts, build_layout, referenced_columns, referenced_aggregates, split_conjuncts
+from executor import read_records, scan, init_scan_worker, parallel_scan, nested_loop_join, hash_join, hash_aggregate, filter_rows, project
+from planner import KeyRange, SelectPlan, plan_select, plan_key_range
+from profiler import Profile, NULL_PROFILE, record_size
+from vectorized import compile_batch_predicate, filter_batches, is_available as vectorization_is_available
 from utils import *
 from messages import *
 
 
 
-class DBMS:
+LOAD_CHUNK_SIZE = 10000  # rows validated and written together by `load data`
+PARALLEL_SCAN_MIN_BYTES = 64 * 1024 * 1024  # tables whose file is smaller are read by a single cursor
+
+
+def transactional(method: Callable=None, changes_schema: bool=False, in_parts: bool=False):
+    """Run a statement in its own transaction, nested in the one opened by BEGIN if any.
+
+    If the statement raises, everything it wrote is rolled back and the error is raised again.
+    Statements of different sessions run at the same time, except those that change schemas, which
+    run alone and keep the other sessions waiting until their transaction ends.
+    A statement run `in_parts` only holds the schema lock, and each statement it calls commits on its own.
+    """
+    if method is None:
+        return functools.partial(transactional, changes_schema=changes_schema, in_parts=in_parts)
+    
+    @functools.wraps(method)
+    def run_in_transaction(self, *args, **kwargs):
+        if self.statement is not None:  # called by another statement, e.g. insert -> insert_many
+            return method(self, *args, **kwargs)
+        holds_lock = self.statement_in_parts  # called by a statement run in parts, e.g. load_data -> insert_many
+        if not holds_lock:
+            if changes_schema:
+                self.schema_lock.acquire_exclusive(self)
+            else:
+                self.schema_lock.acquire_shared(self)
+        try:  # the schema lock is released even if the transaction cannot begin
+            if in_parts:
+                self.statement_in_parts = True
+            else:
+                self.statement = self.env.txn = self.env.begin(self.transaction)
+            result = method(self, *args, **kwargs)
+        except BaseException as error:
+            if self.statement is not None:
+                self.statement.abort()
+            self._forget(self.statement_changes)
+            if isinstance(error, (db.DBLockDeadlockError, db.DBLockNotGrantedError)):
+                raise TransactionConflictError() from error
+            raise
+        else:
+            if self.statement is not None:
+                self.statement.commit()
+            if self.transaction is not None:
+                self.transaction_changes |= self.statement_changes
+        finally:
+            self.statement = self.env.txn = None
+            self.statement_changes = set()
+            if in_parts:
+                self.statement_in_parts = False
+            if not holds_lock:
+                if not changes_schema:
+                    self.schema_lock.release_shared()
+                elif not self.transaction_changes:  # changes made within BEGIN keep the lock until COMMIT or ROLLBACK
+                    self.schema_lock.release_exclusive(self)
+        return result
+    return run_in_transaction
+
+
+class SchemaLock:
+    """Shared by the statements of every session, but held alone by a session that changes schemas.
+
+    That session keeps it until its transaction ends, so no other session sees a schema that may be
+    rolled back, or uses the handles opened for it. Sessions waiting to change schemas go first.
+    A statement waiting longer than LOCK_TIMEOUT fails, so the waiting statements of a server cannot
+    keep the holder from ending its transaction.
+    """
     def __init__(self):
+        self.condition = threading.Condition()
+        self.readers = 0  # statements running with the shared lock
+        self.writers = 0  # sessions waiting for the lock
+        self.owner = None  # session holding the lock alone
+        self.timeout = LOCK_TIMEOUT / 1000000  # seconds
+        
+    def acquire_shared(self, session):
+        with self.condition:
+            if self.owner is not session:
+                if not self.condition.wait_for(lambda: self.owner is None and not self.writers, self.timeout):
+                    raise TransactionConflictError()
+            self.readers += 1
+            
+    def release_shared(self):
+        with self.condition:
+            self.readers -= 1
+            if not self.readers:
+                self.condition.notify_all()
+            
+    def acquire_exclusive(self, session):
+        with self.condition:
+            if self.owner is session:
+                return
+            self.writers += 1
+            acquired = self.condition.wait_for(lambda: self.owner is None and not self.readers, self.timeout)
+            self.writers -= 1
+            if not acquired:
+                self.condition.notify_all()  # statements may be waiting for the writers to go first
+                raise TransactionConflictError()
+            self.owner = session
+            
+    def release_exclusive(self, session):
+        with self.condition:
+            if self.owner is session:
+                self.owner = None
+                self.condition.notify_all()
+
+
+class DBMS:
+    def __init__(self, sync: bool=True, scan_workers: int=0, profile_hook: Callable[[Profile], None]=None, vectorized: bool=False,
+                 allow_load: bool=True, load_dir: str=None):
         self.db_dir = Path("./DB")
         self.db_dir.mkdir(exist_ok=True)
-        self.meta_db = MetaDB()
-        
-        
+        self.env = Environment(self.db_dir, sync)  # every DB is opened in this transactional environment
+        self.handles = HandleManager(self.env)  # DB handles stay open for the life of the DBMS
+        self.handles.get_meta_db()  # opened outside of any transaction, so no rollback closes it
+        self.catalog = Catalog(self.handles)  # deserialized table schemas
+        self.schema_lock = SchemaLock()
+        self.scan_workers = scan_workers  # processes reading the key ranges of a large table, if more than one
+        self.scan_pool = None
+        if scan_workers > 1:  # spawned, as BerkeleyDB handles must not be inherited through fork
+            self.scan_pool = ProcessPoolExecutor(scan_workers, mp_context=multiprocessing.get_context("spawn"),
+                                                 initializer=init_scan_worker, initargs=(self.db_dir,))
+        self.profile_hook = profile_hook  # if set, every SELECT is profiled and its Profile is passed to it
+        self.vectorized = vectorized and vectorization_is_available()  # filters scans in NumPy batches, if NumPy is installed
+        self.allow_load = allow_load  # whether LOAD DATA may read files at all
+        self.load_dir = Path(load_dir).resolve() if load_dir is not None else None  # if set, LOAD DATA only reads the files within it
+        self.owner = None  # DBMS whose environment, handles and schemas a session shares
+        self._start_session()
+        atexit.register(self.close)
+    
+    
+    def open_session(self):
+        """Return a DBMS for one more client, sharing this one's environment, handles and schemas.
+
+        Each session has transactions of its own, so BEGIN in one session does not affect the others.
+        """
+        session = copy.copy(self)
+        session.owner = self
+        session._start_session()
+        return session
+    
+    
+    def _start_session(self):
+        self.transaction = None  # opened by BEGIN, until COMMIT or ROLLBACK
+        self.statement = None  # transaction of the running statement
+        self.statement_in_parts = False  # whether a statement committing in parts, e.g. LOAD DATA, holds the schema lock
+        self.statement_changes = set()  # names of the tables whose schemas the running statement changed
+        self.transaction_changes = set()  # names of the tables whose schemas the transaction opened by BEGIN changed
+    
+    
+    def close(self):
+        """Roll back an unfinished transaction, then close every DB handle and the environment.
+
+        A session only rolls back its own transaction, as the environment is shared with the other sessions.
+        """
+        if self.env is None:  # already closed
+            return
+        if self.transaction is not None:
+            self.rollback()
+        if self.owner is None:
+            if self.scan_pool is not None:
+                self.scan_pool.shutdown()
+            self.handles.close_all()
+            self.env.close()
+        self.env = None
+    
+    
+    def begin(self):
+        if self.transaction is not None:
+            raise TransactionExistenceError()
+        self.transaction = self.env.begin()
+        return BeginSuccess()
+    
+    
+    def commit(self):
+        if self.transaction is None:
+            raise NoTransactionError()
+        self.transaction.commit()
+        self._end_transaction()
+        return CommitSuccess()
+    
+    
+    def rollback(self):
+        if self.transaction is None:
+            raise NoTransactionError()
+        self.transaction.abort()
+        self._forget(self.transaction_changes)
+        self._end_transaction()
+        return RollbackSuccess()
+    
+    
+    def _end_transaction(self):
+        self.transaction = None
+        self.transaction_changes = set()
+        self.schema_lock.release_exclusive(self)
+    
+    
+    def _forget(self, table_names: Set[str]):
+        """Drop the schemas and handles of tables whose changes were rolled back; they are read and opened again when needed."""
+        if table_names:
+            self.catalog.invalidate()
+            for table_name in table_names:
+                self.handles.close_db(table_name)
+    
+    
+    def _put_table(self, table: Table):
+        self.statement_changes.add(table.table_name)
+        self.catalog.put_table(table)
+    
+    
+    def _delete_table(self, table_name: str):
+        self.statement_changes.add(table_name)
+        self.catalog.delete_table(table_name)
+    
+    
+    @transactional(changes_schema=True)
     def create_table(self, table_dict: dict):
         table_name = table_dict["table_name"]
         column_list = table_dict["column_list"]
@@ -51,16 +270,13 @@ class DBMS:
                     raise NonExistingColumnDefError(foreign_key)   
 
         # Error within the database
-        self.meta_db.open_db()
         
-        table_key = self.meta_db.create_key_from_value(table_name)
-        if self.meta_db.exists(table_key):
+        if self.catalog.get_table(table_name):
             raise TableExistenceError()
         
         if foreign_key_dict:
             for foreign_key, (referenced_table_name, referenced_key) in foreign_key_dict.items():
-                referenced_table_key = self.meta_db.create_key_from_value(referenced_table_name)
-                referenced_table = self.meta_db.get(referenced_table_key)
+                referenced_table = self.catalog.get_table(referenced_table_name)
                 if not referenced_table:
                     raise ReferenceTableExistenceError()
                 if referenced_key not in referenced_table:
@@ -70,9 +286,12 @@ class DBMS:
                 foreign_key_type = columns[foreign_key]
                 if not referenced_table.check_reference_type(foreign_key_type, referenced_key):
                     raise ReferenceTypeError()
+                if referenced_key != referenced_table.primary_key[0] and not referenced_table.find_index(referenced_key):
+                    # a later column of a composite primary key needs its own index to be looked up by value
+                    self._add_index(referenced_table, f"pk.{referenced_key}", (referenced_key,))
                 referenced_table.add_reference(table_name)
                 # update referenced table info
-                self.meta_db.put(referenced_table_key, referenced_table)
+                self._put_table(referenced_table)
         
         table = Table(
             table_name=table_name,
@@ -82,372 +301,555 @@ class DBMS:
             foreign_keys=foreign_key_dict
         )
         # add table info to meta db
-        self.meta_db.put(table_key, table)
-        self.meta_db.close_db()
+        self._put_table(table)
         
-        # create table db
-        table_db = DB(table_name)
-        table_db.open_db()
-        table_db.close_db()
+        # create table db and the db of the records referencing it
+        self.handles.get_db(table)
+        self.handles.get_reference_db(table_name)
         
         return CreateTableSuccess(table_name)
     
     
+    @transactional(changes_schema=True)
     def drop_table(self, table_name: str):
         # remove table info
-        self.meta_db.open_db()
-        table_key = self.meta_db.create_key_from_value(table_name)
-        table = self.meta_db.get(table_key)
+        table = self.catalog.get_table(table_name)
         if not table:
             raise NoSuchTable()
         if table.has_reference():
             raise DropReferencedTableError(table_name)
         referencing_tables = table.get_referencing_tables()
         if referencing_tables:
-            for referencing_table in referencing_tables:
-                referencing_table_key = self.meta_db.create_key_from_value(referencing_table)
-                referencing_table_db = self.meta_db.get(referencing_table_key)
-                referencing_table_db.remove_reference(table_name)
-                self.meta_db.put(referencing_table_key, referencing_table_db)
-        self.meta_db.delete(table_key)
-        
-        # remove table records
-        table_db_file = self.meta_db.get_db_file(table_name)
-        table_db_file.unlink()
-        self.meta_db.close_db()
+            for referencing_table in dict.fromkeys(referencing_tables):
+                referencing_table_schema = self.catalog.get_table(referencing_table)
+                referencing_table_schema.remove_reference(table_name)
+                # the indexes created for the foreign keys of the dropped table go, unless other foreign keys still use them
+                still_referenced = {column for other_table in referencing_table_schema.referenced_by
+                                    for referenced_table, column in self.catalog.get_table(other_table).foreign_keys.values()
+                                    if referenced_table == referencing_table}
+                for referenced_table, column in table.foreign_keys.values():
+                    index_name = f"pk.{column}"
+                    if referenced_table == referencing_table and column not in still_referenced and index_name in referencing_table_schema.indexes:
+                        self._remove_index(referencing_table_schema, index_name)
+                self._put_table(referencing_table_schema)
+                self.handles.get_reference_db(referencing_table).remove_referencing_table(table_name)
+        self._delete_table(table_name)
+        
+        # remove table records and indexes
+        self.handles.close_db(table_name)  # the handles must not outlive their files
+        for db_name in [table_name, f"{table_name}.references"] + [f"{table_name}.{index_name}" for index_name in table.indexes]:
+            self.env.remove_db(db_name)
         
         return DropSuccess(table_name)
     
     
+    @transactional(changes_schema=True)
+    def create_index(self, table_name: str, index_name: str, column_names: List[str]):
+        """Create a secondary index on columns of a table and build its entries from the existing records."""
+        table = self.catalog.get_table(table_name)
+        if not table:
+            raise NoSuchTable()
+        if index_name in table.indexes:
+            raise IndexExistenceError()
+        for column_name in column_names:
+            if column_name not in table:
+                raise IndexColumnExistenceError(column_name)
+        
+        self._add_index(table, index_name, column_names)
+        
+        return CreateIndexSuccess(index_name)
+    
+    
+    def _add_index(self, table: Table, index_name: str, column_names: List[str]):
+        table_db = self.handles.get_db(table)  # opened with the existing indexes only
+        table.add_index(index_name, column_names)
+        self._put_table(table)
+        table_db.open_index(index_name, table.indexes[index_name])
+    
+    
+    @transactional(changes_schema=True)
+    def drop_index(self, table_name: str, index_name: str):
+        table = self.catalog.get_table(table_name)
+        if not table:
+            raise NoSuchTable()
+        if index_name not in table.indexes:
+            raise NoSuchIndex()
+        
+        self._remove_index(table, index_name)
+        self._put_table(table)
+        
+        return DropIndexSuccess(index_name)
+    
+    
+    def _remove_index(self, table: Table, index_name: str):
+        table.remove_index(index_name)
+        self.handles.close_db(table.table_name)  # reopened with the remaining indexes when it is next used
+        self.env.remove_db(f"{table.table_name}.{index_name}")
+    
+    
+    @transactional(changes_schema=True)
+    def analyze_table(self, table_name: str):
+        """Collect the statistics of a table and store them with its schema, for the planner to choose join orders and key ranges."""
+        table = self.catalog.get_table(table_name)
+        if not table:
+            raise NoSuchTable()
+        
+        table.statistics = TableStatistics.collect(table, scan(self.handles.get_db(table)))
+        self._put_table(table)
+        
+        return AnalyzeTableSuccess(table_name)
+    
+    
+    @transactional
     def explain_describe_desc(self, table_name: str):
-        self.meta_db.open_db()
-        table_key = self.meta_db.create_key_from_value(table_name)
-        table = self.meta_db.get(table_key)
+        table = self.catalog.get_table(table_name)
         if not table:
             raise NoSuchTable()
-        self.meta_db.close_db()
         return table
     
     
+    @transactional
     def show_tables(self):
-        self.meta_db.open_db()
         output = "\n------------------------\n"
-        all_tables = self.meta_db.keys()
-        for table_key in all_tables:
-            output += table_key.decode() + "\n"
+        for table_name in self.catalog.table_names():
+            output += table_name + "\n"
         output += "------------------------"
-        self.meta_db.close_db()
         return output
     
     
     def insert(self, table_dict: dict, value_list: list):
+        self.insert_many(table_dict, [value_list])
+        return InsertResult()
+    
+    
+    @transactional
+    def insert_many(self, table_dict: dict, value_lists: List[list]):
+        """Insert several rows in one statement; nothing is written unless every row is valid."""
         table_name = table_dict["table_name"]
         column_name_list = table_dict["column_name_list"]
         
-        self.meta_db.open_db()
-        table_key = self.meta_db.create_key_from_value(table_name)
-        table = self.meta_db.get(table_key)
+        table = self.catalog.get_table(table_name)
         if not table:
             raise NoSuchTable()
-        self.meta_db.close_db()
         
         if column_name_list:
-            if len(column_name_list) != len(value_list):
+            if any(len(column_name_list) != len(value_list) for value_list in value_lists):
                 raise InsertTypeMismatchError()
             for column_name in column_name_list:
                 if column_name not in table:
                     raise InsertColumnExistenceError(column_name)
             
-        if len(table.columns.keys()) != len(value_list):
+        if any(len(table.columns.keys()) != len(value_list) for value_list in value_lists):
             raise InsertTypeMismatchError()
         
-        for column_name, value in zip(table.columns.keys(), value_list):
-            if value is None and column_name in table.not_null_keys:
+        # validate column by column
+        for i, column_name in enumerate(table.columns.keys()):
+            if column_name in table.not_null_keys and any(value_list[i] is None for value_list in value_lists):
                 raise InsertColumnNonNullableError(column_name)
         
-        if not all([is_valid_type(data_type, value) for data_type, value in zip(table.columns.values(), value_list)]):
-            raise InsertTypeMismatchError()
+        for i, data_type in enumerate(table.columns.values()):
+            if not all([is_valid_type(data_type, value_list[i]) for value_list in value_lists]):
+                raise InsertTypeMismatchError()
         
-        data = {}
-        primary_value = []
-        referencing = dict()
-        for (column_name, data_type), value in zip(table.columns.items(), value_list):
-            if data_type.startswith("char") and value is not None:
+        rows = [list(value_list) for value_list in value_lists]
+        for i, data_type in enumerate(table.columns.values()):
+            if data_type.startswith("char"):
                 max_len = eval_char_max_len(data_type)
-                value = value[:max_len]
-            if table.primary_key and column_name in table.primary_key:  # may be composite primary key
-                primary_value.append(value)
-            if table.foreign_keys and column_name in table.foreign_keys:  # one foreign key per column
-                referenced_table_name, referenced_column_name = table.foreign_keys[column_name]
-                # get referenced table schema
-                self.meta_db.open_db()
-                referenced_table_key = self.meta_db.create_key_from_value(referenced_table_name)
-                referenced_table = self.meta_db.get(referenced_table_key)
-                self.meta_db.close_db()
-                # get referenced record
-                referenced_table_db = DB(referenced_table_name)
-                referenced_table_db.open_db()
-                referenced_key = referenced_table_db.create_key_from_value((value,))
-                referenced_record = None
-                if len(referenced_table.primary_key) == 1:
-                    referenced_record = referenced_table_db.get(referenced_key)
-                else:  # composite primary key
-                    all_primary_values = referenced_table_db.keys()
-                    for primary_value in all_primary_values:
-                        if referenced_key.decode() in primary_value.decode():
-                            referenced_record = referenced_table_db.get(primary_value)
-                            break
-                if referenced_record is None:
-                    raise InsertReferentialIntegrityError()
-                referencing[(referenced_table_name, referenced_column_name)] = {referenced_record.data[referenced_column_name]}
-                assert referenced_record.data[referenced_column_name] == value
-                referenced_record.add_to_referenced_by(table_name, column_name, value)
-                referenced_table_db.put(referenced_key, referenced_record)
-                referenced_table_db.close_db()
-            data[column_name] = value
-        primary_value = tuple(primary_value) if primary_value else None
-        record = Record(table_name, data, primary_value, referencing)
-        
-        table_db = DB(table_name)
-        table_db.open_db()
-        record_key = table_db.create_key_from_value(primary_value) if primary_value else table_db.create_random_key()
-        if table_db.exists(record_key):
-            raise InsertDuplicatePrimaryKeyError()
-        table_db.put(record_key, record)
-        table_db.close_db()
+                for row in rows:
+                    if row[i] is not None:
+                        row[i] = row[i][:max_len]
         
-        return InsertResult()
+        self._insert_rows(table, rows)
+        
+        return InsertManyResult(len(rows))
+    
+    
+    def _insert_rows(self, table: Table, rows: List[list]):
+        table_name = table.table_name
+        column_names = list(table.columns.keys())
+        
+        # resolve each distinct referenced value once
+        referenced_keys = {}  # key: (referenced table name, referenced column name, value), value: referenced record key
+        if table.foreign_keys:
+            for column_name, (referenced_table_name, referenced_column_name) in table.foreign_keys.items():  # one foreign key per column
+                i = column_names.index(column_name)
+                for value in dict.fromkeys(row[i] for row in rows):
+                    referenced_key = self._find_referenced_key(referenced_table_name, referenced_column_name, value)
+                    if referenced_key is None:
+                        raise InsertReferentialIntegrityError()
+                    referenced_keys[(referenced_table_name, referenced_column_name, value)] = referenced_key
+        
+        table_db = self.handles.get_db(table)
+        records = {}  # key: record key, value: Record
+        for row in rows:
+            data = dict(zip(column_names, row))
+            primary_value = tuple(data[column_name] for column_name in table.primary_key) if table.primary_key else None  # may be composite primary key
+            record_key = table_db.create_key_from_value(primary_value) if primary_value else table_db.create_random_key()
+            if record_key in records or table_db.exists(record_key):
+                raise InsertDuplicatePrimaryKeyError()
+            referencing = dict()
+            if table.foreign_keys:
+                for column_name, (referenced_table_name, referenced_column_name) in table.foreign_keys.items():
+                    referencing[(referenced_table_name, referenced_column_name)] = {data[column_name]}
+            records[record_key] = Record(table_name, data, primary_value, referencing)
+        
+        # every row is valid, so write the new records and one reference entry per referenced record
+        for record_key, record in records.items():
+            table_db.put(record_key, record)
+            for (referenced_table_name, referenced_column_name), (value,) in record.referencing.items():
+                referenced_key = referenced_keys[(referenced_table_name, referenced_column_name, value)]
+                self.handles.get_reference_db(referenced_table_name).add_reference(referenced_key, table_name, record_key)
+    
+    
+    def _find_referenced_key(self, referenced_table_name: str, referenced_column_name: str, value):
+        """Return the key of the record of the referenced table whose primary key holds the value, or None."""
+        return next(self._referenced_keys(referenced_table_name, referenced_column_name, value), None)
+        
+    
+    def _referenced_keys(self, referenced_table_name: str, referenced_column_name: str, value) -> Iterator[bytes]:
+        """Yield the keys of the records of the referenced table whose primary key holds the value.
+
+        A column of a composite primary key may hold the value in several records, and a referencing
+        record is recorded against the first of them at the time it is inserted.
+        """
+        if value is None:  # null never matches a primary key
+            return
+        referenced_table = self.catalog.get_table(referenced_table_name)
+        referenced_table_db = self.handles.get_db(referenced_table)
+        if len(referenced_table.primary_key) == 1:
+            referenced_key = referenced_table_db.create_key_from_value((value,))
+            if referenced_table_db.exists(referenced_key):
+                yield referenced_key
+        else:  # composite primary key: a prefix of the keys, or of an index starting with the column
+            if referenced_column_name == referenced_table.primary_key[0]:
+                key_range = KeyRange((value,))
+            else:
+                index_name = referenced_table.find_index(referenced_column_name)
+                if index_name is None:  # tables created before their key columns were indexed
+                    position = list(referenced_table.columns).index(referenced_column_name)
+                    for key, encoded in read_records(referenced_table_db):
+                        if referenced_table_db.decode_row(encoded, {position})[position] == value:
+                            yield key
+                    return
+                key_range = KeyRange((value,), index_name=index_name)
+            for key, _ in read_records(referenced_table_db, key_range):
+                yield key
 
     
+    @transactional(in_parts=True)
+    def load_data(self, table_name: str, file_path: str):
+        """Stream a CSV file (or TSV, by its extension) into a table, in chunks of `LOAD_CHUNK_SIZE` rows.
+
+        A first line holding the column names is skipped. Empty fields and `null` are loaded as null.
+        Each chunk is checked like a multi-row INSERT and committed as one transaction, so the chunks before
+        a failing one stay loaded and a load is not limited by one log flush per row.
+        With a `load_dir`, relative paths are relative to it and no file outside of it is read.
+        """
+        if not self.allow_load:
+            raise LoadDisabledError()
+        table = self.catalog.get_table(table_name)
+        if not table:
+            raise NoSuchTable()
+        path = Path(file_path)
+        if self.load_dir is not None:
+            path = (self.load_dir / path).resolve()  # links and ".." are followed before the path is checked
+            if not path.is_relative_to(self.load_dir):
+                raise LoadFileAccessError(file_path)
+        if not path.is_file():
+            raise LoadFileExistenceError(file_path)
+        
+        data_types = list(table.columns.values())
+        table_dict = {"table_name": table_name, "column_name_list": None}
+        num_loaded = 0
+        with path.open(newline="") as file:
+            reader = csv.reader(file, delimiter="\t" if path.suffix.lower() == ".tsv" else ",")
+            first_row = next(reader, None)
+            if first_row is None:
+                return LoadDataResult(0)
+            if [field.strip().lower() for field in first_row] != list(table.columns.keys()):  # not a header
+                reader = itertools.chain([first_row], reader)
+            while True:
+                chunk = []
+                for fields in itertools.islice(reader, LOAD_CHUNK_SIZE):
+                    if len(fields) == len(data_types):  # rows of the wrong length are rejected by insert_many
+                        fields = [cast_value(data_type, field) for data_type, field in zip(data_types, fields)]
+                    chunk.append(fields)
+                if not chunk:
+                    break
+                self.insert_many(table_dict, chunk)
+                num_loaded += len(chunk)
+        
+        return LoadDataResult(num_loaded)
+    
+    
+    @transactional
     def delete(self, table_name: str, where_clause: str):
-        self.meta_db.open_db()
-        table_key = self.meta_db.create_key_from_value(table_name)
-        table = self.meta_db.get(table_key)
+        table = self.catalog.get_table(table_name)
         if not table:
             raise NoSuchTable()
-        self.meta_db.close_db()
         
-        table_db = DB(table_name)
-        table_db.open_db()
-        outer_cursor = table_db.create_cursor()
+        predicate = compile_condition(where_clause, [table]) if where_clause else None
+        key_range = plan_key_range(table, split_conjuncts(where_clause), [table]) if where_clause else None
+        
+        table_db = self.handles.get_db(table)
+        # collect the matching records first, so that the table is not modified while it is read
+        matches = [(key, value) for key, value in read_records(table_db, key_range)
+                   if not predicate or predicate(table_db.decode_row(value)) == True]
         
         success_cnt = 0
         fail_cnt = 0
-        key_value_pair = outer_cursor.first()
-        while key_value_pair:
-            key, value = key_value_pair
-            record = Record.deserialize(value)
-            satisfies = self._evaluate_condition(deepcopy(where_clause), [table], record.data) if where_clause else True
-            if satisfies == True:
-                if list(record.referenced_by.values()):
-                    fail_cnt += 1
-                else:
-                    if record.referencing:
-                        for (referenced_table_name, referenced_column_name), referenced_value_set in record.referencing.items():
-                            for referenced_value in referenced_value_set:
-                                referenced_table_db = DB(referenced_table_name)
-                                referenced_table_db.open_db()
-                                inner_cursor = referenced_table_db.create_cursor()
-                                key_value_pair = inner_cursor.first()
-                                while key_value_pair:
-                                    key, value = key_value_pair
-                                    referenced_record = Record.deserialize(value)
-                                    for column in table.columns:
-                                        if ((table_name, column) in referenced_record.referenced_by and 
-                                            referenced_value in referenced_record.referenced_by[(table_name, column)]):
-                                            referenced_record.remove_referenced_by(table_name, column, referenced_value)
-                                            referenced_table_db.put(key, referenced_record)  # update reference
-                                    key_value_pair = inner_cursor.next()
-                                referenced_table_db.discard_cursor(inner_cursor)
-                                referenced_table_db.close_db()
-                    table_db.delete_by_cursor(outer_cursor)
-                    success_cnt += 1
-            key_value_pair = outer_cursor.next()
-            
-        table_db.discard_cursor(outer_cursor)
-        table_db.close_db()
+        reference_db = self.handles.get_reference_db(table_name) if table.has_reference() else None
+        # the records that may hold the reference entries of each referenced value are resolved once per statement,
+        # and the entries are removed together at the end
+        referenced_keys = {}  # key: (referenced table name, referenced column name, value), value: referenced record keys
+        removed_references = defaultdict(list)  # key: referenced table name, value: [(referenced key, referencing key), ...]
+        for key, value in matches:
+            if reference_db is not None and reference_db.is_referenced(key):
+                fail_cnt += 1
+            else:
+                if table.foreign_keys:
+                    record = table_db.decode_record(value)
+                    for (referenced_table_name, referenced_column_name), referenced_value_set in record.referencing.items():
+                        for referenced_value in referenced_value_set:
+                            lookup = (referenced_table_name, referenced_column_name, referenced_value)
+                            if lookup not in referenced_keys:
+                                referenced_keys[lookup] = list(self._referenced_keys(*lookup))
+                            for referenced_key in referenced_keys[lookup]:  # only the entry the insert added exists
+                                removed_references[referenced_table_name].append((referenced_key, key))
+                table_db.delete(key)
+                success_cnt += 1
+        for referenced_table_name, references in removed_references.items():
+            self.handles.get_reference_db(referenced_table_name).remove_references(table_name, sorted(references))
         
         return DeleteResult(success_cnt), DeleteReferentialIntegrityPassed(fail_cnt) if fail_cnt else None
         
     
-    def _evaluate_condition(self, condition, table_list: List[Table], record: dict):
-        def get_record_value(operand):
-            table_name, column_name = operand
-            if table_name and not any([table_name == table.table_name for table in table_list]):
-                raise WhereTableNotSpecified()
-            found_tables = [table for table in table_list if column_name in table]
-            if len(found_tables) < 1:
-                raise WhereColumnNotExist()
-            elif len(found_tables) > 1:
-                if not table_name:  # column name is ambiguous
-                    raise WhereAmbiguousReference()
-                table = next(table for table in found_tables if table_name == table.table_name)
-            else:
-                table = found_tables[0]
-            if table_name and table_name != table.table_name:
-                raise WhereColumnNotExist()
-            if table_name:
-                prefixed_column_name = f"{table_name}.{column_name}"
-                if prefixed_column_name in record:
-                    return record[prefixed_column_name]
-            return record[column_name]
-        
-        def determine_operand_value(operand):
-            if operand is None:
-                value = operand
-            elif len(operand) == 1:  # comparable_value
-                value = operand[0]
-            else:  # table_name, column_name
-                value = get_record_value(operand)
-            return value
-            
-        op = condition["op"]
-        if op in comparison_op_map | null_op_map:
-            op, left_operand, right_operand = map(condition.get, ["op", "left_operand", "right_operand"])
-            left_value = determine_operand_value(left_operand)
-            right_value = determine_operand_value(right_operand)
-            
-            if op in comparison_op_map and is_comparable(left_value, right_value) == False:
-                raise WhereIncomparableError()
+    @transactional
+    def select(self, tables: list, select_columns: list, where_clause: dict, group_by: list=None, having: dict=None, profile: Profile=None):
+        """Return the formatted result of a SELECT. If a `profile_hook` is set, the statement is profiled and the hook is called with its Profile."""
+        if profile is None and self.profile_hook is not None:
+            profile = Profile()
+        output = self._select(tables, select_columns, where_clause, group_by, having, profile or NULL_PROFILE)
+        if profile is not None and self.profile_hook is not None:
+            self.profile_hook(profile)
+        return output
+        
+    
+    @transactional
+    def explain_analyze(self, tables: list, select_columns: list, where_clause: dict, group_by: list=None, having: dict=None,
+                        profile: Profile=None):
+        """Execute a SELECT and return its plan and profile instead of its result."""
+        profile = profile or Profile()
+        self._select(tables, select_columns, where_clause, group_by, having, profile)  # the result is discarded
+        return '\n' + '\n'.join(profile.plan) + self._format_select_output(profile.table(), ["phase", "time_ms", "rows_in", "rows_out", "bytes_read"])
+        
+    
+    def _select(self, tables: list, select_columns: list, where_clause: dict, group_by: list, having: dict, profile: Profile):
+        with profile.phase("catalog"):
+            named_tables = []
+            for table_name in tables:
+                table = self.catalog.get_table(table_name)
+                if not table:
+                    raise SelectTableExistenceError(table_name)
+                named_tables.append(table)
+            # a table listed twice is read once, but names resolve against every listing as before,
+            # so its columns stay ambiguous unless qualified
+            table_list = list({table.table_name: table for table in named_tables}.values())
             
-            if op in comparison_op_map:
-                if left_value is None or right_value is None:
-                    output = UNKNOWN
-                else:
-                    output = comparison_op_map[op](left_value, right_value)
-            else:
-                output = null_op_map[op](left_value, right_value)
-            return output
+            projection, final_columns = self._resolve_projection(named_tables, select_columns)
+            grouped = bool(group_by) or having is not None or any(len(column) == 3 for _, column in projection)
+            if grouped:
+                group_columns, aggregates = self._resolve_grouping(named_tables, projection, group_by, having)
+        
+        with profile.phase("plan"):
+            if where_clause:
+                compile_condition(where_clause, named_tables)  # raises the errors of the whole where clause up front
+            plan = plan_select(table_list, where_clause)
+            layout = build_layout(plan.table_order)
             
-        elif op == "not":
-            boolean_test = condition["boolean_test"]
-            return not_(self._evaluate_condition(boolean_test, table_list, record))
-        
-        elif op == "and":
-            boolean_factors = condition["boolean_factors"]
-            return and_(*[self._evaluate_condition(boolean_factor, table_list, record) for boolean_factor in boolean_factors])
-        
-        elif op == "or":
-            boolean_terms = condition["boolean_terms"]
-            return or_(*[self._evaluate_condition(boolean_term, table_list, record) for boolean_term in boolean_terms])
-        
-        else:  # None
-            _, remaining_condition = condition.popitem()  # "boolean_terms", "boolean_factors", "boolean_test"
-            if remaining_condition is not None:
-                return self._evaluate_condition(remaining_condition, table_list, record)
-    
-    
-    def select(self, tables: list, select_columns: list, where_clause: dict):
-        table_list = []
-        self.meta_db.open_db()
-        for table_name in tables:
-            table_key = self.meta_db.create_key_from_value(table_name)
-            table = self.meta_db.get(table_key)
-            if not table:
-                raise SelectTableExistenceError(table_name)
-            table_list.append(table)
-        self.meta_db.close_db()
-        
-        final_columns = []
-        if select_columns:
-            for table_name, column_name in select_columns:
-                found_tables = [table for table in table_list if column_name in table]
-                if len(found_tables) < 1:
-                    raise SelectColumnResolveError(column_name)
-                elif len(found_tables) > 1:
-                    if not table_name:
-                        raise SelectColumnResolveError(column_name)
-                    found_table = next(table for table in found_tables if table_name == table.table_name)
-                else:
-                    found_table = found_tables[0]       
-                if table_name and table_name != found_table.table_name:
-                    raise SelectColumnResolveError(column_name)
-                final_column = f"{found_table.table_name}.{column_name}" if table_name else column_name
-                final_columns.append(final_column)
+            # only the columns the query reads are decoded
+            needed_columns = {column for _, column in projection} | set(referenced_columns(where_clause, table_list) if where_clause else [])
+            if grouped:
+                # grouped rows hold the group by columns, then the aggregates
+                group_layout = {column: i for i, column in enumerate(group_columns + aggregates)}
+                having_predicate = compile_condition(having, table_list, group_layout) if having else None
+                needed_columns |= set(group_columns) | {(table_name, column_name) for _, table_name, column_name in aggregates}
+            needed_positions = {}
+            for table in table_list:
+                positions = {i for i, column_name in enumerate(table.columns) if (table.table_name, column_name) in needed_columns}
+                needed_positions[table.table_name] = positions if len(positions) < len(table.columns) else None
+            if profile.enabled:
+                profile.plan = plan.describe()
+                if grouped:
+                    profile.plan.append("hash aggregate" + (" by " + ", ".join(f"{table_name}.{column_name}" for table_name, column_name in group_columns)
+                                                            if group_columns else "")
+                                        + f", computing {len(aggregates)} aggregate" + ("s" if len(aggregates) != 1 else "")
+                                        + (", checking the having clause" if having else ""))
+        
+        with profile.phase("catalog"):
+            table_dbs = {table.table_name: self.handles.get_db(table) for table in table_list}
+        rows, stage = self._execute_joins(plan, table_list, table_dbs, layout, needed_positions, profile)  # rows follow `layout`
+        if grouped:
+            # only the state of each group is held, while the joined rows stream through
+            rows = hash_aggregate(rows, [layout[column] for column in group_columns],
+                                  [(function, layout[(table_name, column_name)] if column_name else None) for function, table_name, column_name in aggregates])
+            rows, stage, layout = profile.stage("aggregate", rows, [stage]), "aggregate", group_layout
+            if having_predicate is not None:
+                rows, stage = profile.stage("having", filter_rows(rows, having_predicate), [stage]), "having"
+        final_records = list(profile.stage("project", project(rows, [layout[column] for _, column in projection]), [stage]))
+        
+        with profile.phase("format"):
+            return self._format_select_output(final_records, final_columns)
         
+    
+    def _resolve_projection(self, table_list: List[Table], select_columns: list):
+        """Return the (output column name, (table_name, column_name)) pairs of the selected columns, and the output column names.
+
+        Aggregates are paired with their (function, table_name, column_name) instead.
+        """
         all_columns = []
         for table_schema in table_list:
             all_columns.extend(list(table_schema.columns.keys()))
         counter = Counter(all_columns)
         common_columns = set([column for column, count in counter.items() if count > 1])
-                    
-        all_records_with_table = {}
-        for table_name in tables:
-            all_records_with_table[table_name] = []
-            table_db = DB(table_name)
-            table_db.open_db()
-            cursor = table_db.create_cursor()
-            key_value_pair = cursor.first()
-            while key_value_pair:
-                key, value = key_value_pair
-                record = Record.deserialize(value)
-                record_data = {}
-                for column_name, value in record.data.items():
-                    if column_name in common_columns:
-                        prefixed_column_name = f"{table_name}.{column_name}"
-                        record_data[prefixed_column_name] = value
-                    else:
-                        record_data[column_name] = value
-                all_records_with_table[table_name].append(record_data)
-                key_value_pair = cursor.next()
-            table_db.discard_cursor(cursor)
-            table_db.close_db()
-        
-        cartesian_product = itertools.product(*all_records_with_table.values())
-        records_product = [{k: v for record in combination_tuple for k, v in record.items()} for combination_tuple in cartesian_product]
-        
-        if where_clause:
-            filtered_records = []
-            for record in records_product:
-                satisfies = self._evaluate_condition(deepcopy(where_clause), table_list, record)  # otherwise the original where is modified
-                if satisfies == True:
-                    filtered_records.append(record)
-        else:
-            filtered_records = records_product  # list of dict[column_name, value]
-            
-        if select_columns:  # final output has headers by the specification of select_columns
-            final_records = []
-            for record in filtered_records:
-                final_record = {}
-                for table_name, column_name in select_columns:
-                    value = None
-                    if table_name:
-                        prefixed_column_name = f"{table_name}.{column_name}"
-                        try:
-                            final_record[prefixed_column_name] = record[prefixed_column_name]
-                        except KeyError:
-                            final_record[prefixed_column_name] = record[column_name]
-                    else:
-                        final_record[column_name] = record[column_name]
-                final_records.append(final_record)
+        
+        projection = []  # [(final_column, (table_name, column_name)), ...]
+        if select_columns:
+            for selected_column in select_columns:
+                if len(selected_column) == 3:  # function, table_name, column_name
+                    function, table_name, column_name = selected_column
+                    if column_name is None:  # count(*)
+                        projection.append((f"{function}(*)", (function, None, None)))
+                        continue
+                    found_table = self._resolve_selected_column(table_list, table_name, column_name)
+                    argument = f"{found_table.table_name}.{column_name}" if table_name else column_name
+                    projection.append((f"{function}({argument})", (function, found_table.table_name, column_name)))
+                    continue
+                table_name, column_name = selected_column
+                found_table = self._resolve_selected_column(table_list, table_name, column_name)
+                final_column = f"{found_table.table_name}.{column_name}" if table_name else column_name
+                projection.append((final_column, (found_table.table_name, column_name)))
         else:
-            final_records = filtered_records
-            final_columns = []
             for table_schema in table_list:
                 for column in table_schema.columns:
-                    if column in common_columns:
-                        final_columns.append(f"{table_schema.table_name}.{column}")
-                    else:
-                        final_columns.append(column)
-            
-        headers = final_records[0].keys() if final_records else final_columns
+                    final_column = f"{table_schema.table_name}.{column}" if column in common_columns else column
+                    projection.append((final_column, (table_schema.table_name, column)))
+        projection = list(dict.fromkeys(projection))  # a column selected twice is output once
+        return projection, [final_column for final_column, _ in projection]
+        
+    
+    def _resolve_selected_column(self, table_list: List[Table], table_name: str, column_name: str) -> Table:
+        """Return the table that owns a column referenced outside the where clause."""
+        found_tables = [table for table in table_list if column_name in table]
+        if len(found_tables) < 1:
+            raise SelectColumnResolveError(column_name)
+        elif len(found_tables) > 1:
+            if not table_name:
+                raise SelectColumnResolveError(column_name)
+            found_table = next(table for table in found_tables if table_name == table.table_name)
+        else:
+            found_table = found_tables[0]
+        if table_name and table_name != found_table.table_name:
+            raise SelectColumnResolveError(column_name)
+        return found_table
         
-        return self._format_select_output(final_records, headers)
+    
+    def _resolve_grouping(self, table_list: List[Table], projection: list, group_by: list, having: dict):
+        """Return the resolved group by columns and the aggregates computed for each group: those selected, then those of the having clause.
+
+        Every selected column, and every column in the having clause, must be grouped by.
+        """
+        group_columns = list(dict.fromkeys((self._resolve_selected_column(table_list, table_name, column_name).table_name, column_name)
+                                           for table_name, column_name in group_by or []))
+        aggregates = [column for _, column in projection if len(column) == 3]
+        checked_columns = [column for _, column in projection if len(column) == 2]
+        if having:
+            aggregates += referenced_aggregates(having, table_list)
+            checked_columns += referenced_columns(having, table_list)
+        for table_name, column_name in checked_columns:
+            if (table_name, column_name) not in group_columns:
+                raise SelectGroupByError(column_name)
+        aggregates = list(dict.fromkeys(aggregates))
+        for function, table_name, column_name in aggregates:
+            if function in ("sum", "avg") and next(table for table in table_list if table.table_name == table_name).columns[column_name] != "int":
+                raise SelectAggregateTypeError(function, column_name)
+        return group_columns, aggregates
         
     
-    def _format_select_output(self, records: List[Dict], headers: List[str]):
+    def _execute_joins(self, plan: SelectPlan, table_list: List[Table], table_dbs: Dict[str, DB], layout: Dict[Tuple[str, str], int],
+                       needed_positions: Dict[str, Set[int]], profile: Profile):
+        """Return the rows of the joined tables and the name of the profile stage yielding them."""
+        def scan_table(table):
+            table_name = table.table_name
+            conjuncts, positions = plan.table_conjuncts[table_name], needed_positions[table_name]
+            table_db, key_range = table_dbs[table_name], plan.key_ranges[table_name]
+            if self._scans_in_parallel(table_db, key_range):
+                rows = parallel_scan(self.scan_pool, table_db, conjuncts, table_list, positions, self.scan_workers)
+                return profile.stage(f"parallel scan {table_name}", rows), f"parallel scan {table_name}"
+            predicate = compile_conjuncts(conjuncts, table_list, build_layout([table])) if conjuncts else None
+            batch_predicate = compile_batch_predicate(conjuncts, table, table_list) if self.vectorized and conjuncts else None
+            if batch_predicate is not None:
+                records = profile.stage(f"scan {table_name}", read_records(table_db, key_range), measure=record_size)
+                rows = filter_batches(table_db, records, batch_predicate, predicate, positions)
+                return profile.stage(f"vectorized filter {table_name}", rows, [f"scan {table_name}"]), f"vectorized filter {table_name}"
+            if not profile.enabled:
+                return scan(table_db, predicate, positions, key_range), None
+            # the steps of `scan`, timed one by one
+            records = profile.stage(f"scan {table_name}", read_records(table_db, key_range), measure=record_size)
+            rows = profile.stage(f"deserialize {table_name}", (table_db.decode_row(value, positions) for _, value in records), [f"scan {table_name}"])
+            if predicate is None:
+                return rows, f"deserialize {table_name}"
+            return profile.stage(f"filter {table_name}", filter_rows(rows, predicate), [f"deserialize {table_name}"]), f"filter {table_name}"
+        
+        # the first table is streamed through its cursor, each joined table is read once
+        tables = {table.table_name: table for table in table_list}
+        rows, stage = scan_table(plan.first_table)
+        for i, step in enumerate(plan.steps):
+            right_rows, right_stage = scan_table(step.table)
+            right_rows = list(right_rows)
+            if step.join_keys:
+                left_positions = [layout[joined_column] for joined_column, _ in step.join_keys]
+                right_positions = [list(step.table.columns).index(column_name) for _, column_name in step.join_keys]
+                # char columns may hold date-like strings, so their values are checked as `=` checks them
+                checked_keys = [i for i, ((table_name, column_name), column_name_in_step) in enumerate(step.join_keys)
+                                if len(column_value_types(tables[table_name].columns[column_name])
+                                       | column_value_types(step.table.columns[column_name_in_step])) > 1]
+                build_left = step.build_left  # estimated from the statistics, if any
+                if i == 0:  # both sides are base tables, so build the hash table on the smaller one
+                    # only as many left rows as the right side holds are read ahead, the rest keeps streaming
+                    left_rows = list(itertools.islice(rows, len(right_rows)))
+                    build_left = len(left_rows) < len(right_rows)
+                    rows = left_rows if build_left else itertools.chain(left_rows, rows)
+                rows = hash_join(rows, right_rows, left_positions, right_positions, build_left, checked_keys)
+            else:
+                rows = nested_loop_join(rows, right_rows)
+            rows, stage = profile.stage(f"join {step.table.table_name}", rows, [stage, right_stage]), f"join {step.table.table_name}"
+            if step.conjuncts:
+                rows = profile.stage(f"filter join {step.table.table_name}", filter_rows(rows, compile_conjuncts(step.conjuncts, table_list, layout)), [stage])
+                stage = f"filter join {step.table.table_name}"
+        return rows, stage
+        
+    
+    def _scans_in_parallel(self, table_db: DB, key_range: KeyRange):
+        """Whether a table is read by the scan workers.
+
+        Only whole tables with a large file are, and not within BEGIN, as the workers cannot see what the transaction has written.
+        """
+        if self.scan_pool is None or key_range is not None or self.transaction is not None:
+            return False
+        return table_db.db_file.stat().st_size >= PARALLEL_SCAN_MIN_BYTES
+        
+    
+    def _format_select_output(self, records: List[tuple], headers: List[str]):
         def create_separator(column_widths):
             return '+-' + '-+-'.join('-' * width for width in column_widths) + '-+'
         
-        for record in records:
-            for k, v in record.items():
-                if v is None:
-                    record[k] = "null"
+        records = [["null" if value is None else str(value) for value in record] for record in records]
         
         column_widths = [len(header) for header in headers]
         for record in records:
-            for i, value in enumerate(record.values()):
-                column_widths[i] = max(column_widths[i], len(str(value)))
+            for i, value in enumerate(record):
+                column_widths[i] = max(column_widths[i], len(value))
         
         output = '\n'
         output += create_separator(column_widths) + '\n'
@@ -455,7 +857,7 @@ class DBMS:
         output += create_separator(column_widths) + '\n'
         
         for record in records:
-            output += '| ' + ' | '.join(str(value).ljust(width) for value, width in zip(record.values(), column_widths)) + ' |\n'
+            output += '| ' + ' | '.join(value.ljust(width) for value, width in zip(record, column_widths)) + ' |\n'
         output += create_separator(column_widths)
         
         return output
\ No newline at end of file
@@ -0,0 +1,255 @@
+from collections import defaultdict
+from concurrent.futures import Executor
+from operator import itemgetter
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Set, Tuple
+
+from db_model import Table, DB, IndexDB, Environment
+from condition import compile_conjuncts, build_layout
+from messages import WhereIncomparableError
+from planner import KeyRange
+from utils import infer_type
+
+
+# Every operator takes and yields row tuples, so a SELECT is a chain of generators
+# and rows flow through it one at a time: scan -> join -> filter -> (aggregate -> filter) -> project.
+
+
+def read_records(table_db: DB, key_range: KeyRange=None) -> Iterator[Tuple[bytes, bytes]]:
+    """Yield the (key, encoded record) pairs of an opened table DB, only within a KeyRange if given.
+
+    Records are read in primary key order, or in index key order if the KeyRange is over an index.
+    """
+    if key_range is not None and key_range.is_point:  # no cursor is needed for a single key
+        key = table_db.create_key_from_value(key_range.prefix)
+        value = table_db.get_encoded(key)
+        if value is not None:
+            yield key, value
+        return
+    if key_range is not None and key_range.index_name is not None:
+        yield from read_index(table_db.indexes[key_range.index_name], key_range)
+        return
+    cursor = table_db.create_cursor()
+    try:
+        if key_range is None:
+            in_range = None
+            key_value_pair = cursor.first()
+        else:
+            start, in_range = key_bounds(table_db, key_range)
+            key_value_pair = cursor.set_range(start)
+        while key_value_pair:
+            key, value = key_value_pair
+            if in_range is not None and not in_range(key):
+                break
+            yield key, value
+            key_value_pair = cursor.next()
+    finally:
+        table_db.discard_cursor(cursor)
+
+
+def read_index(index_db: IndexDB, key_range: KeyRange) -> Iterator[Tuple[bytes, bytes]]:
+    """Yield the (primary key, encoded record) pairs of the records whose index key is within a KeyRange."""
+    start, in_range = key_bounds(index_db, key_range)
+    cursor = index_db.create_cursor()
+    try:
+        entry = index_db.cursor_set_range(cursor, start)
+        while entry:
+            index_key, primary_key, value = entry
+            if not in_range(index_key):
+                break
+            yield primary_key, value
+            entry = index_db.cursor_next(cursor)
+    finally:
+        index_db.discard_cursor(cursor)
+
+
+def key_bounds(key_db: DB, key_range: KeyRange) -> Tuple[bytes, Callable]:
+    """Return the first key to seek for a KeyRange and a test that is False once a key is past its end."""
+    prefix = key_db.create_key_from_value(key_range.prefix)
+    start = key_db.create_key_from_value(key_range.prefix + (key_range.lower[0],)) if key_range.lower else prefix
+    if key_range.upper:
+        end = key_db.create_key_from_value(key_range.prefix + (key_range.upper[0],))
+        if key_range.upper[1]:  # keys holding the upper value start with `end`
+            return start, lambda key: key < end or key.startswith(end)
+        return start, lambda key: key < end
+    return start, lambda key: key.startswith(prefix)
+
+
+def scan(table_db: DB, predicate: Callable=None, positions: Set[int]=None, key_range: KeyRange=None) -> Iterator[tuple]:
+    """Yield the values of every record in an opened table DB, in column order.
+
+    If a predicate is given, only the rows for which it is True are yielded. If positions are given,
+    only those columns are decoded and the others are None. If a KeyRange is given, only the records
+    whose primary key is in it are read.
+    """
+    for _, value in read_records(table_db, key_range):
+        row = table_db.decode_row(value, positions)
+        if predicate is None or predicate(row) == True:
+            yield row
+
+
+# A parallel scan splits a table into key ranges read by worker processes, which join the environment
+# of the DBMS once. The workers get the conditions instead of the compiled predicate, which cannot be
+# pickled, and send back only the rows that satisfy them.
+
+_worker_env = None  # environment joined by a scan worker process
+
+
+def init_scan_worker(db_dir: Path):
+    global _worker_env
+    _worker_env = Environment(db_dir, recover=False)
+
+
+def scan_partition(table: Table, start: bytes, end: bytes, conjuncts: List[dict], table_list: List[Table], positions: Set[int]) -> List[tuple]:
+    """In a scan worker, return the rows of the records with keys from `start` to before `end` that satisfy the conjuncts.
+
+    None for `start` or `end` is the first or past the last key. Returns None if the conditions compare
+    incomparable values, as the error is raised again in the DBMS process.
+    """
+    table_db = DB(table.table_name, _worker_env)
+    table_db.define_meta(table)
+    table_db.open_db()
+    try:
+        predicate = compile_conjuncts(conjuncts, table_list, build_layout([table])) if conjuncts else None
+        rows = []
+        cursor = table_db.create_cursor()
+        try:
+            key_value_pair = cursor.first() if start is None else cursor.set_range(start)
+            while key_value_pair and (end is None or key_value_pair[0] < end):
+                row = table_db.decode_row(key_value_pair[1], positions)
+                if predicate is None or predicate(row) == True:
+                    rows.append(row)
+                key_value_pair = cursor.next()
+        finally:
+            table_db.discard_cursor(cursor)
+        return rows
+    except WhereIncomparableError:
+        return None
+    finally:
+        table_db.close_db()
+
+
+def parallel_scan(pool: Executor, table_db: DB, conjuncts: List[dict], table_list: List[Table], positions: Set[int], partitions: int) -> Iterator[tuple]:
+    """Yield the rows `scan` yields for a whole table, read in `partitions` key ranges by the workers of a process pool.
+
+    The rows come in primary key order, as the ranges are yielded in order.
+    """
+    bounds = [None] + table_db.split_keys(partitions) + [None]
+    futures = [pool.submit(scan_partition, table_db.meta, start, end, conjuncts, table_list, positions)
+               for start, end in zip(bounds, bounds[1:])]
+    try:
+        for future in futures:
+            rows = future.result()
+            if rows is None:
+                raise WhereIncomparableError()
+            yield from rows
+    finally:
+        for future in futures:  # if the rows are no longer needed
+            future.cancel()
+
+
+def nested_loop_join(left_rows: Iterable[tuple], right_rows: List[tuple]) -> Iterator[tuple]:
+    """Yield the concatenation of every left row with every right row (cartesian product)."""
+    for left_row in left_rows:
+        for right_row in right_rows:
+            yield left_row + right_row
+
+
+def hash_join(left_rows: Iterable[tuple], right_rows: Iterable[tuple], left_positions: List[int], right_positions: List[int],
+              build_left: bool=False, checked_keys: List[int]=()) -> Iterator[tuple]:
+    """Yield the concatenation of left and right rows whose key columns are equal.
+
+    The hash table is built on the right rows and probed with the left rows, unless `build_left` is set.
+    Keys containing null never match, as `=` with null is UNKNOWN.
+    `checked_keys` are the indexes of the keys whose values may be of different types, e.g. char columns
+    holding date-like strings. As `=` does for every pair of rows, WhereIncomparableError is raised if a
+    value of one side has another type than a value of the other side.
+    """
+    left_key, right_key = itemgetter(*left_positions), itemgetter(*right_positions)
+    has_null = (lambda key: key is None) if len(left_positions) == 1 else (lambda key: None in key)
+    if build_left:
+        build_rows, build_key, probe_rows, probe_key = left_rows, left_key, right_rows, right_key
+        build_positions, probe_positions = left_positions, right_positions
+    else:
+        build_rows, build_key, probe_rows, probe_key = right_rows, right_key, left_rows, left_key
+        build_positions, probe_positions = right_positions, left_positions
+    checks = [(build_positions[i], probe_positions[i], set()) for i in checked_keys]  # with the types of the built values
+    built_types = {}  # key: built value, value: its type, inferred once as key values repeat
+
+    hash_table = defaultdict(list)
+    for row in build_rows:
+        for build_position, _, build_types in checks:
+            value = row[build_position]
+            if value is not None:
+                if value not in built_types:
+                    built_types[value] = infer_type(value)
+                build_types.add(built_types[value])
+        key = build_key(row)
+        if not has_null(key):
+            hash_table[key].append(row)
+
+    for probe_row in probe_rows:
+        for _, probe_position, build_types in checks:
+            value = probe_row[probe_position]
+            if value is not None and build_types - {built_types[value] if value in built_types else infer_type(value)}:
+                raise WhereIncomparableError()
+        matches = hash_table.get(probe_key(probe_row))  # null never equals a built key
+        if matches:
+            if build_left:
+                for build_row in matches:
+                    yield build_row + probe_row
+            else:
+                for build_row in matches:
+                    yield probe_row + build_row
+
+
+def filter_rows(rows: Iterable[tuple], predicate: Callable) -> Iterator[tuple]:
+    """Yield the rows for which the compiled predicate is True (not False or UNKNOWN)."""
+    for row in rows:
+        if predicate(row) == True:
+            yield row
+
+
+def project(rows: Iterable[tuple], positions: List[int]) -> Iterator[tuple]:
+    """Yield only the values at `positions` of each row."""
+    for row in rows:
+        yield tuple(row[position] for position in positions)
+
+
+# key: aggregate function, value: (initial state, state after adding a non-null value, result of a state)
+AGGREGATE_FUNCTIONS = {
+    "count": (0, lambda state, value: state + 1, lambda state: state),
+    "sum": (None, lambda state, value: value if state is None else state + value, lambda state: state),
+    "min": (None, lambda state, value: value if state is None or value < state else state, lambda state: state),
+    "max": (None, lambda state, value: value if state is None or value > state else state, lambda state: state),
+    "avg": ((0, 0), lambda state, value: (state[0] + value, state[1] + 1), lambda state: state[0] / state[1] if state[1] else None),
+}
+
+
+def hash_aggregate(rows: Iterable[tuple], key_positions: List[int], aggregates: List[Tuple[str, int]]) -> Iterator[tuple]:
+    """Yield a row per group of rows with equal values at `key_positions`: those values, then the result of each aggregate.
+
+    `aggregates` are (function, position) pairs, the position being None for count(*). Null values are not
+    aggregated, and nulls form a group of their own. The rows are consumed as they come, keeping only the
+    state of each group. Without key positions, all rows form one group, even if there are none.
+    """
+    functions = [AGGREGATE_FUNCTIONS[function] for function, _ in aggregates]
+    accumulators = [(i, position, add) for i, ((_, position), (_, add, _)) in enumerate(zip(aggregates, functions))]
+    group_key = itemgetter(*key_positions) if key_positions else (lambda row: ())
+    groups = {}  # key: group key, value: state of each aggregate
+    if not key_positions:
+        groups[()] = [initial for initial, _, _ in functions]
+
+    for row in rows:
+        key = group_key(row)
+        states = groups.get(key)
+        if states is None:
+            states = groups[key] = [initial for initial, _, _ in functions]
+        for i, position, add in accumulators:
+            value = row[position] if position is not None else row  # count(*) counts every row
+            if value is not None:
+                states[i] = add(states[i], value)
+
+    for key, states in groups.items():
+        key = key if len(key_positions) != 1 else (key,)
+        yield key + tuple(result(state) for (_, _, result), state in zip(functions, states))
@@ -23,11 +23,56 @@ class DropSuccess(SuccessLog):
         super().__init__(f"'{self.table_name}' table is dropped")
       
         
+class CreateIndexSuccess(SuccessLog):
+    def __init__(self, index_name):
+        self.index_name = index_name
+        super().__init__(f"'{self.index_name}' index is created")
+
+
+class DropIndexSuccess(SuccessLog):
+    def __init__(self, index_name):
+        self.index_name = index_name
+        super().__init__(f"'{self.index_name}' index is dropped")
+
+
+class AnalyzeTableSuccess(SuccessLog):
+    def __init__(self, table_name):
+        self.table_name = table_name
+        super().__init__(f"'{self.table_name}' table is analyzed")
+
+
 class InsertResult(SuccessLog):
     def __init__(self):
         super().__init__("The row is inserted")
 
 
+class InsertManyResult(SuccessLog):
+    def __init__(self, num_inserted):
+        self.num_inserted = num_inserted
+        super().__init__(f"'{self.num_inserted}' row(s) are inserted")
+
+
+class LoadDataResult(SuccessLog):
+    def __init__(self, num_loaded):
+        self.num_loaded = num_loaded
+        super().__init__(f"'{self.num_loaded}' row(s) are loaded")
+
+
+class BeginSuccess(SuccessLog):
+    def __init__(self):
+        super().__init__("Transaction is started")
+
+
+class CommitSuccess(SuccessLog):
+    def __init__(self):
+        super().__init__("Transaction is committed")
+
+
+class RollbackSuccess(SuccessLog):
+    def __init__(self):
+        super().__init__("Transaction is rolled back")
+
+
 class DeleteResult(SuccessLog):
     def __init__(self, num_deleted):
         self.num_deleted = num_deleted
@@ -118,6 +163,25 @@ class DropReferencedTableError(Exception):
         super().__init__(f"Drop table has failed: '{self.table_name}' is referenced by other table")
 
 
+class IndexExistenceError(Exception):
+    """Raised when the table already has an index with the same name."""
+    def __init__(self):
+        super().__init__("Create index has failed: index with the same name already exists")
+
+
+class IndexColumnExistenceError(Exception):
+    """Raised when the column to index does not exist in the table."""
+    def __init__(self, column_name):
+        self.column_name = column_name
+        super().__init__(f"Create index has failed: '{self.column_name}' does not exist")
+
+
+class NoSuchIndex(Exception):
+    """Raised when the index to drop does not exist on the table."""
+    def __init__(self):
+        super().__init__("No such index")
+
+
 class InsertTypeMismatchError(Exception):
     """Raised when the type of the value does not match the type of the column."""
     def __init__(self):
@@ -150,6 +214,44 @@ class InsertReferentialIntegrityError(Exception):  # NOTE: optional
         super().__init__("Insertion has failed: Referential integrity violation")
         
         
+class LoadFileExistenceError(Exception):
+    """Raised when the file to load does not exist."""
+    def __init__(self, file_path):
+        self.file_path = file_path
+        super().__init__(f"Load data has failed: '{self.file_path}' does not exist")
+
+
+class LoadFileAccessError(Exception):
+    """Raised when the file to load is outside the directory files may be loaded from."""
+    def __init__(self, file_path):
+        self.file_path = file_path
+        super().__init__(f"Load data has failed: '{self.file_path}' is not in the load directory")
+
+
+class LoadDisabledError(Exception):
+    """Raised when loading files is not allowed, e.g. for the clients of a server started without a load directory."""
+    def __init__(self):
+        super().__init__("Load data has failed: loading files is not allowed")
+        
+        
+class TransactionExistenceError(Exception):
+    """Raised when BEGIN is used while a transaction is in progress."""
+    def __init__(self):
+        super().__init__("Begin has failed: a transaction is already in progress")
+
+
+class NoTransactionError(Exception):
+    """Raised when COMMIT or ROLLBACK is used without a transaction in progress."""
+    def __init__(self):
+        super().__init__("No transaction in progress")
+
+
+class TransactionConflictError(Exception):
+    """Raised when a statement deadlocks with, or waits too long for, the transaction of another session."""
+    def __init__(self):
+        super().__init__("Statement has failed: data is locked by another transaction")
+
+
 class SelectTableExistenceError(Exception):
     """Raised when the table for selection does not exist."""
     def __init__(self, table_name):
@@ -164,6 +266,21 @@ class SelectColumnResolveError(Exception):
         super().__init__(f"Selection has failed: fail to resolve '{self.column_name}'")
         
         
+class SelectGroupByError(Exception):
+    """Raised when a column of a grouped selection is neither grouped by nor aggregated."""
+    def __init__(self, column_name):
+        self.column_name = column_name
+        super().__init__(f"Selection has failed: '{self.column_name}' must be grouped by or aggregated")
+        
+        
+class SelectAggregateTypeError(Exception):
+    """Raised when a column which is not int is summed or averaged."""
+    def __init__(self, function_name, column_name):
+        self.function_name = function_name
+        self.column_name = column_name
+        super().__init__(f"Selection has failed: '{self.function_name}' of non-int column '{self.column_name}'")
+        
+        
 class WhereIncomparableError(Exception):
     """Raised when the operands in the where condition are incomparable."""
     def __init__(self):
@@ -182,4 +299,9 @@ class WhereColumnNotExist(Exception):
         
 class WhereAmbiguousReference(Exception):
     def __init__(self):
-        super().__init__(f"Where clause contains ambiguous reference")
\ No newline at end of file
+        super().__init__(f"Where clause contains ambiguous reference")
+        
+        
+class WhereAggregateError(Exception):
+    def __init__(self):
+        super().__init__("Where clause cannot contain aggregate functions")
\ No newline at end of file
@@ -0,0 +1,342 @@
+import re
+from datetime import date
+from typing import Dict, FrozenSet, List, Set, Tuple
+
+from db_model import Table, ColumnStatistics
+from condition import split_conjuncts, equi_join_columns, referenced_columns, column_comparison
+from utils import DATE_PATTERN, INT_MIN, INT_MAX, null_op_map
+
+
+DEFAULT_SELECTIVITY = 1 / 3  # fraction of rows kept by a condition the statistics say nothing about
+INDEX_SCAN_MAX_FRACTION = 0.2  # an index range expected to hold more of its table is read as a full scan instead
+MAX_REORDERED_TABLES = 10  # more tables are combined in FROM order, as the orders considered grow as 2^n
+
+
+class KeyRange:
+    """Keys to read instead of the whole table, in its primary key or in one of its indexes.
+
+    The keys hold `prefix` in their first columns and a value of the next column within `lower` and
+    `upper`, each given as (value, inclusive) or None if unbounded. `index_name` is None for primary keys.
+    If `prefix` holds every primary key column, the range is a single key that is looked up directly.
+    """
+    def __init__(self, prefix: tuple, lower: Tuple[object, bool]=None, upper: Tuple[object, bool]=None, is_point: bool=False,
+                 index_name: str=None):
+        self.prefix = prefix
+        self.lower = lower
+        self.upper = upper
+        self.is_point = is_point
+        self.index_name = index_name
+
+    def __str__(self):
+        key = "primary key" if self.index_name is None else f"index {self.index_name}"
+        bounds = [repr(value) for value in self.prefix]
+        if self.lower:
+            bounds.append(f"{'>=' if self.lower[1] else '>'} {self.lower[0]!r}")
+        if self.upper:
+            bounds.append(f"{'<=' if self.upper[1] else '<'} {self.upper[0]!r}")
+        return f"{'lookup' if self.is_point else 'range'} on {key} ({', '.join(bounds)})"
+
+
+class JoinStep:
+    """Joins one more table to the rows produced by the previous steps of a plan."""
+    def __init__(self, table: Table, join_keys: List[Tuple[Tuple[str, str], str]], conjuncts: List[dict]):
+        self.table = table
+        self.join_keys = join_keys  # [((joined table_name, column_name), column_name in this table), ...]
+        self.conjuncts = conjuncts  # conditions across tables that can be checked once this table is joined
+        self.build_left = False  # whether the hash table is built on the rows joined so far instead of this table's rows
+        self.estimated_rows = None  # rows expected after this step, if the tables have statistics
+
+    @property
+    def method(self):
+        return "hash join" if self.join_keys else "nested loop"
+
+
+class SelectPlan:
+    """Order in which the tables of a SELECT are combined and where each condition of the WHERE clause is checked."""
+    def __init__(self, first_table: Table, steps: List[JoinStep], table_conjuncts: Dict[str, List[dict]], key_ranges: Dict[str, KeyRange],
+                 scan_rows: Dict[str, float]=None):
+        self.first_table = first_table
+        self.steps = steps
+        self.table_conjuncts = table_conjuncts  # key: table name, value: conditions checked while scanning that table
+        self.key_ranges = key_ranges  # key: table name, value: KeyRange read instead of the whole table, or None
+        self.scan_rows = scan_rows  # key: table name, value: rows its scan is expected to yield, or None without statistics
+
+    @property
+    def table_order(self) -> List[Table]:
+        return [self.first_table] + [step.table for step in self.steps]
+
+    def describe(self) -> List[str]:
+        """Return a line per table, in the order they are combined, as shown by EXPLAIN ANALYZE."""
+        def scan_line(table):
+            key_range = self.key_ranges[table.table_name]
+            line = f"scan {table.table_name}: " + ("full scan" if key_range is None else str(key_range))
+            return line + conditions_text(self.table_conjuncts[table.table_name]) + rows_text(self.scan_rows[table.table_name] if self.scan_rows else None)
+
+        lines = [scan_line(self.first_table)]
+        for step in self.steps:
+            join_keys = " and ".join(f"{table_name}.{column_name} = {step.table.table_name}.{step_column_name}"
+                                     for (table_name, column_name), step_column_name in step.join_keys)
+            lines.append(f"{step.method} {step.table.table_name}" + (f" on {join_keys}" if join_keys else "") + conditions_text(step.conjuncts)
+                         + rows_text(step.estimated_rows))
+            lines.append("  " + scan_line(step.table))
+        return lines
+
+
+def conditions_text(conjuncts: List[dict]) -> str:
+    if not conjuncts:
+        return ""
+    return f", checking {len(conjuncts)} condition" + ("s" if len(conjuncts) > 1 else "")
+
+
+def rows_text(estimated_rows: float) -> str:
+    return "" if estimated_rows is None else f", about {round(estimated_rows)} rows"
+
+
+def plan_select(table_list: List[Table], where_clause: dict) -> SelectPlan:
+    """Choose the order the tables are combined in and push every condition down to the earliest point it can be checked.
+
+    Conditions on a single table are checked while that table is scanned, `column = column` conditions
+    between two tables become hash join keys, and other conditions across tables are checked as soon as
+    all of their tables are joined. If every table has statistics, the tables are combined in the order
+    with the lowest estimated cost, otherwise in FROM order.
+    """
+    table_conjuncts = {table.table_name: [] for table in table_list}
+    join_conjuncts = []  # (left column, right column)
+    cross_conjuncts = []  # (conjunct, referenced table names)
+    for conjunct in split_conjuncts(where_clause) if where_clause else []:
+        columns = equi_join_columns(conjunct, table_list)
+        if columns:
+            join_conjuncts.append(columns)
+            continue
+        table_names = {table_name for table_name, _ in referenced_columns(conjunct, table_list)}
+        if len(table_names) > 1:
+            cross_conjuncts.append((conjunct, table_names))
+        else:  # conditions without columns are checked on the first table
+            table_name = table_names.pop() if table_names else table_list[0].table_name
+            table_conjuncts[table_name].append(conjunct)
+
+    scan_rows = None
+    table_order = table_list
+    if all(table.statistics is not None for table in table_list):
+        scan_rows = {table.table_name: estimate_scan_rows(table, table_conjuncts[table.table_name], table_list) for table in table_list}
+        if len(table_list) <= MAX_REORDERED_TABLES:
+            table_order = choose_join_order(table_list, scan_rows, join_conjuncts, cross_conjuncts)
+
+    joined_table_names = {table_order[0].table_name}
+    rows = scan_rows[table_order[0].table_name] if scan_rows else None  # estimated rows joined so far
+    steps = []
+    for table in table_order[1:]:
+        estimate = estimate_join(rows, joined_table_names, table, table_list, scan_rows, join_conjuncts, cross_conjuncts) if scan_rows else None
+        join_keys = []
+        for left_column, right_column in list(join_conjuncts):
+            if right_column[0] == table.table_name and left_column[0] in joined_table_names:
+                join_keys.append((left_column, right_column[1]))
+            elif left_column[0] == table.table_name and right_column[0] in joined_table_names:
+                join_keys.append((right_column, left_column[1]))
+            else:
+                continue
+            join_conjuncts.remove((left_column, right_column))
+        joined_table_names.add(table.table_name)
+        conjuncts = [conjunct for conjunct, table_names in cross_conjuncts if table.table_name in table_names and table_names <= joined_table_names]
+        step = JoinStep(table, join_keys, conjuncts)
+        if estimate is not None:
+            step.build_left = rows < scan_rows[table.table_name]  # the hash table is built on the smaller side
+            rows = step.estimated_rows = estimate[1]
+        steps.append(step)
+    key_ranges = {table.table_name: plan_key_range(table, table_conjuncts[table.table_name], table_list) for table in table_list}
+    return SelectPlan(table_order[0], steps, table_conjuncts, key_ranges, scan_rows)
+
+
+# Without an index to look up joined rows, each table is read once whatever the order, and the order decides
+# how many rows flow between the steps. A hash join costs the rows on both of its sides and the rows it
+# yields, and a nested loop costs every combination of its sides.
+
+def choose_join_order(table_list: List[Table], scan_rows: Dict[str, float], join_conjuncts: List[Tuple[Tuple[str, str], Tuple[str, str]]],
+                      cross_conjuncts: List[Tuple[dict, Set[str]]]) -> List[Table]:
+    """Return the order of the tables with the lowest estimated cost, found by dynamic programming over the sets of joined tables.
+
+    Orders with the same cost keep the tables in FROM order.
+    """
+    best = {}  # key: names of the joined tables, value: (estimated cost, estimated rows, order) of the cheapest way to join them
+    for table in table_list:
+        best[frozenset([table.table_name])] = (scan_rows[table.table_name], scan_rows[table.table_name], [table])
+    for _ in range(len(table_list) - 1):
+        joined_sets = list(best.items())
+        best = {}
+        for joined_table_names, (cost, rows, order) in joined_sets:
+            for table in table_list:
+                if table.table_name in joined_table_names:
+                    continue
+                step_cost, step_rows = estimate_join(rows, joined_table_names, table, table_list, scan_rows, join_conjuncts, cross_conjuncts)
+                key = joined_table_names | {table.table_name}
+                if key not in best or cost + step_cost < best[key][0]:
+                    best[key] = (cost + step_cost, step_rows, order + [table])
+    return next(iter(best.values()))[2]
+
+
+def estimate_join(rows: float, joined_table_names: FrozenSet[str], table: Table, table_list: List[Table], scan_rows: Dict[str, float],
+                  join_conjuncts: List[Tuple[Tuple[str, str], Tuple[str, str]]], cross_conjuncts: List[Tuple[dict, Set[str]]]) -> Tuple[float, float]:
+    """Return the estimated cost and rows of joining a table to `rows` rows of the joined tables."""
+    table_rows = scan_rows[table.table_name]
+    tables = {table.table_name: table for table in table_list}
+    joined_rows = rows * table_rows
+    has_join_keys = False
+    for left_column, right_column in join_conjuncts:
+        if right_column[0] == table.table_name and left_column[0] in joined_table_names:
+            left_column, right_column = right_column, left_column
+        elif not (left_column[0] == table.table_name and right_column[0] in joined_table_names):
+            continue
+        has_join_keys = True
+        # each value of the column with fewer distinct values matches one value of the other column
+        distinct_counts = [min(tables[table_name].statistics.columns[column_name].distinct_count, scan_rows[table_name])
+                           for table_name, column_name in (left_column, right_column)]
+        joined_rows /= max(max(distinct_counts), 1)
+    for _, table_names in cross_conjuncts:
+        if table.table_name in table_names and table_names <= joined_table_names | {table.table_name}:
+            joined_rows *= DEFAULT_SELECTIVITY
+    cost = rows + table_rows + joined_rows if has_join_keys else rows * table_rows
+    return cost, joined_rows
+
+
+def estimate_scan_rows(table: Table, conjuncts: List[dict], table_list: List[Table]) -> float:
+    """Return the number of rows of a table expected to satisfy its conditions, assuming they are independent."""
+    rows = table.statistics.row_count
+    for conjunct in conjuncts:
+        rows *= conjunct_selectivity(table, conjunct, table_list)
+    return rows
+
+
+def conjunct_selectivity(table: Table, conjunct: dict, table_list: List[Table]) -> float:
+    """Return the fraction of a table's rows expected to satisfy a condition on it."""
+    statistics = table.statistics
+    if statistics.row_count == 0:
+        return 1.0
+    if conjunct["op"] in null_op_map:
+        _, column_name = referenced_columns(conjunct, table_list)[0]
+        null_fraction = statistics.columns[column_name].null_count / statistics.row_count
+        return null_fraction if conjunct["op"] == "is" else 1 - null_fraction
+    comparison = column_comparison(conjunct, table_list)
+    if not comparison:
+        return DEFAULT_SELECTIVITY
+    (_, column_name), op, value = comparison
+    column_statistics = statistics.columns[column_name]
+    non_null_fraction = 1 - column_statistics.null_count / statistics.row_count  # comparisons with null are never True
+    if op == "=":
+        return non_null_fraction * equality_selectivity(column_statistics)
+    elif op == "!=":
+        return non_null_fraction * (1 - equality_selectivity(column_statistics))
+    lower = (value, op == ">=") if op in (">", ">=") else None
+    upper = (value, op == "<=") if op in ("<", "<=") else None
+    return non_null_fraction * range_selectivity(column_statistics, lower, upper)
+
+
+def equality_selectivity(column_statistics: ColumnStatistics) -> float:
+    """Fraction of the non-null values equal to a constant, assuming every distinct value is as frequent."""
+    return 1 / column_statistics.distinct_count if column_statistics.distinct_count else 0.0
+
+
+def range_selectivity(column_statistics: ColumnStatistics, lower: Tuple[object, bool], upper: Tuple[object, bool]) -> float:
+    """Fraction of the non-null values within bounds, assuming they are spread evenly between the minimum and maximum.
+
+    Only `int` and `date` values can be interpolated; other bounds keep DEFAULT_SELECTIVITY of the values.
+    """
+    low, high = as_number(column_statistics.min_value), as_number(column_statistics.max_value)
+    start = as_number(lower[0]) if lower else low
+    end = as_number(upper[0]) if upper else high
+    if low is None or high is None or start is None or end is None:
+        return DEFAULT_SELECTIVITY
+    start, end = max(start, low), min(end, high)
+    if start > end:
+        return 0.0
+    if high == low:
+        return 1.0
+    return max((end - start) / (high - low), equality_selectivity(column_statistics))
+
+
+def as_number(value) -> int:
+    """Return an `int` value or the day number of a date value, or None for other values."""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and re.fullmatch(DATE_PATTERN, value):
+        try:
+            return date.fromisoformat(value).toordinal()
+        except ValueError:
+            return None
+    return None
+
+
+def plan_key_range(table: Table, conjuncts: List[dict], table_list: List[Table]) -> KeyRange:
+    """Find the keys a table scan can be limited to from its conditions, or None if it must read every record.
+
+    Equality on every primary key column is a point lookup. Otherwise the primary key or the index whose
+    range fixes the most columns is used, and the primary key wins ties.
+    The range only narrows the scan: the conditions are still checked on every record read.
+    """
+    bounds = {}  # key: column name, value: [(op, value), ...]
+    for conjunct in conjuncts:
+        comparison = column_comparison(conjunct, table_list)
+        if not comparison:
+            continue
+        (table_name, column_name), op, value = comparison
+        if table_name == table.table_name and op != "!=" and is_key_value(table.columns[column_name], value):
+            bounds.setdefault(column_name, []).append((op, value))
+    if not bounds:
+        return None
+
+    key_ranges = []
+    if table.primary_key:
+        prefix, lower, upper = column_range(table.primary_key, bounds)
+        if len(prefix) == len(table.primary_key):  # equality on every primary key column
+            return KeyRange(prefix, is_point=True)
+        key_ranges.append(KeyRange(prefix, lower, upper))
+    for index_name, column_names in table.indexes.items():
+        prefix, lower, upper = column_range(column_names, bounds)
+        key_ranges.append(KeyRange(prefix, lower, upper, index_name=index_name))
+    key_ranges = [key_range for key_range in key_ranges if key_range.prefix or key_range.lower or key_range.upper]
+    if not key_ranges:
+        return None
+    if table.statistics is not None:  # the range expected to read the fewest records
+        estimated_rows = {id(key_range): estimate_range_rows(table, key_range) for key_range in key_ranges}
+        key_range = min(key_ranges, key=lambda key_range: estimated_rows[id(key_range)])
+        if key_range.index_name is not None and estimated_rows[id(key_range)] > INDEX_SCAN_MAX_FRACTION * table.statistics.row_count:
+            return None  # each record found through an index is read on its own, so a full scan is cheaper
+        return key_range
+    return max(key_ranges, key=lambda key_range: (len(key_range.prefix), (key_range.lower is not None) + (key_range.upper is not None)))
+
+
+def estimate_range_rows(table: Table, key_range: KeyRange) -> float:
+    """Return the number of records of a table expected within a KeyRange."""
+    column_names = table.primary_key if key_range.index_name is None else table.indexes[key_range.index_name]
+    rows = table.statistics.row_count
+    for column_name in column_names[:len(key_range.prefix)]:
+        rows *= equality_selectivity(table.statistics.columns[column_name])
+    if key_range.lower or key_range.upper:
+        rows *= range_selectivity(table.statistics.columns[column_names[len(key_range.prefix)]], key_range.lower, key_range.upper)
+    return rows
+
+
+def column_range(column_names: Tuple[str], bounds: Dict[str, List[Tuple[str, object]]]) -> Tuple[tuple, Tuple[object, bool], Tuple[object, bool]]:
+    """Return the values fixed by `=` on the leading columns, and the tightest lower and upper bounds on the next column."""
+    prefix = []
+    lower = upper = None
+    for column_name in column_names:
+        column_bounds = bounds.get(column_name, [])
+        equal_values = [value for op, value in column_bounds if op == "="]
+        if equal_values:
+            prefix.append(equal_values[0])
+            continue
+        lower_bounds = [(value, op == ">=") for op, value in column_bounds if op in (">", ">=")]
+        upper_bounds = [(value, op == "<=") for op, value in column_bounds if op in ("<", "<=")]
+        lower = max(lower_bounds, key=lambda bound: (bound[0], not bound[1])) if lower_bounds else None  # tightest bound
+        upper = min(upper_bounds, key=lambda bound: (bound[0], bound[1])) if upper_bounds else None
+        break
+    return tuple(prefix), lower, upper
+
+
+def is_key_value(data_type: str, value) -> bool:
+    """Whether a constant compares with the values of a column the same way its encoded key does."""
+    if data_type == "int":
+        return isinstance(value, int) and INT_MIN <= value <= INT_MAX
+    elif data_type == "date":
+        return isinstance(value, str) and re.fullmatch(DATE_PATTERN, value) is not None
+    return isinstance(value, str)
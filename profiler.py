@@ -0,0 +1,115 @@
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Iterable, Iterator, List, Tuple
+
+
+class Profile:
+    """Time spent in each phase of one statement, with the rows in and out of each stage of a SELECT and the bytes it reads.
+
+    The stages of a SELECT are generators pulling rows from each other, so they run interleaved. The
+    clock is always charged to the innermost phase or stage running, so the time of a stage excludes the
+    time of the stages it pulls rows from.
+    """
+    enabled = True
+
+    def __init__(self, query: str=None, parse_time: float=None):
+        self.query = query
+        self.times = defaultdict(float)  # key: phase or stage name, value: seconds, in the order they are started
+        self.inputs = {}  # key: stage name, value: names of the stages it reads rows from
+        self.rows_out = Counter()  # key: stage name
+        self.bytes_read = Counter()  # key: stage name reading a DB, value: bytes of the keys and records read
+        self.plan = []  # lines describing the plan of the SELECT
+        self.running = []  # phases and stages started and not yet ended, innermost last
+        self.clock = None  # when the time of the innermost one was last charged
+        if parse_time is not None:
+            self.times["parse"] = parse_time
+
+    def start(self, name: str):
+        now = time.perf_counter()
+        if self.running:
+            self.times[self.running[-1]] += now - self.clock
+        self.running.append(name)
+        self.clock = now
+
+    def end(self):
+        now = time.perf_counter()
+        self.times[self.running.pop()] += now - self.clock
+        self.clock = now
+
+    @contextmanager
+    def phase(self, name: str):
+        """Charge the time spent in the `with` block to a phase, such as the catalog lookups or formatting."""
+        self.times[name] += 0.0
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.end()
+
+    def stage(self, name: str, rows: Iterable, inputs: List[str]=(), measure: Callable=None) -> Iterator:
+        """Yield the rows of a stage, charging the time spent producing each one to `name` and counting them.
+
+        `inputs` are the stages whose rows this stage reads. If `measure` is given, it returns the bytes
+        read for each row, as for the (key, encoded record) pairs read from a DB.
+        """
+        self.times[name] += 0.0
+        self.inputs[name] = list(inputs)
+        return self._run_stage(name, iter(rows), measure)
+
+    def _run_stage(self, name: str, rows: Iterator, measure: Callable) -> Iterator:
+        while True:
+            self.start(name)
+            try:
+                row = next(rows)
+            except StopIteration:
+                return
+            finally:
+                self.end()
+            self.rows_out[name] += 1
+            if measure is not None:
+                self.bytes_read[name] += measure(row)
+            yield row
+
+    @property
+    def total_time(self) -> float:
+        return sum(self.times.values())
+
+    def table(self) -> List[Tuple[str, str, str, str, str]]:
+        """Return a (phase, time in ms, rows in, rows out, bytes read) row per phase and stage, then their total."""
+        rows = []
+        for name, seconds in self.times.items():
+            if name in self.inputs:
+                rows_in = str(sum(self.rows_out[input_name] for input_name in self.inputs[name])) if self.inputs[name] else ""
+                rows_out = str(self.rows_out[name])
+            else:
+                rows_in = rows_out = ""
+            bytes_read = str(self.bytes_read[name]) if name in self.bytes_read else ""
+            rows.append((name, f"{seconds * 1000:.3f}", rows_in, rows_out, bytes_read))
+        rows.append(("total", f"{self.total_time * 1000:.3f}", "", "", ""))
+        return rows
+
+    def summary(self) -> str:
+        """Return the profile on one line, as logged for each statement."""
+        phases = ", ".join(f"{name} {seconds * 1000:.3f} ms" + (f" ({self.rows_out[name]} rows)" if name in self.inputs else "")
+                           for name, seconds in self.times.items())
+        return f"{self.total_time * 1000:.3f} ms {self.query or ''} -- {phases}"
+
+
+class NullProfile(Profile):
+    """Profile of a statement that is not profiled: its phases and stages are run as they are, at no cost."""
+    enabled = False
+
+    def phase(self, name: str):
+        return nullcontext()
+
+    def stage(self, name: str, rows: Iterable, inputs: List[str]=(), measure: Callable=None) -> Iterable:
+        return rows
+
+
+NULL_PROFILE = NullProfile()
+
+
+def record_size(key_value_pair: Tuple[bytes, bytes]) -> int:
+    key, value = key_value_pair
+    return len(key) + len(value)
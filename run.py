@@ -1,82 +1,158 @@
+import sys
+import threading
+import time
+
 from lark import Lark
 
 from dbms import DBMS
 from messages import *
+from profiler import Profile
 from sql_transformer import SQLTransformer
 
 PROMPT = "DB_2023-12345> "  # personal information
 
-dbms = DBMS()
+QUERY_ERRORS = (
+    SyntaxError, NoSuchTable, DuplicateColumnDefError, DuplicatePrimaryKeyDefError, 
+    ReferenceTypeError, ReferenceNonPrimaryKeyError, ReferenceColumnExistenceError, ReferenceTableExistenceError, 
+    NonExistingColumnDefError, TableExistenceError, CharLengthError, DropReferencedTableError, 
+    IndexExistenceError, IndexColumnExistenceError, NoSuchIndex,
+    InsertTypeMismatchError, InsertColumnExistenceError, InsertColumnNonNullableError,
+    InsertDuplicatePrimaryKeyError, InsertReferentialIntegrityError,
+    LoadFileExistenceError, LoadFileAccessError, LoadDisabledError,
+    TransactionExistenceError, NoTransactionError, TransactionConflictError,
+    SelectTableExistenceError, SelectColumnResolveError, SelectGroupByError, SelectAggregateTypeError,
+    WhereIncomparableError, WhereTableNotSpecified, WhereColumnNotExist, WhereAmbiguousReference, WhereAggregateError
+)  # errors reported to the user, after which the remaining queries of the input are skipped
+
 
 def main():
-    with open('grammar.lark') as file:
-        sql_parser = Lark(file.read(), start="command", lexer="basic")
+    scan_workers = int(sys.argv[sys.argv.index("--scan-workers") + 1]) if "--scan-workers" in sys.argv else 0
+    profile_hook = log_profile if "--profile" in sys.argv else None  # with --profile, the profile of every select is logged
+    dbms = DBMS(sync="--nosync" not in sys.argv, scan_workers=scan_workers, profile_hook=profile_hook,
+                vectorized="--vectorized" in sys.argv)  # with --nosync, commits do not wait for the disk
     
     exit = False
     while not exit:
         query_list = parse_query_sequence(input(PROMPT))
         for query in query_list:
             try:
-                sql_transformer = SQLTransformer()
-                statement, table, record, tables, select_columns, where = parse_query(sql_parser, sql_transformer, query)
-                if statement == 'exit':
-                    exit = True  # end program only when exit query is entered
-                    break
-                if statement == "create table":
-                    success = dbms.create_table(table)
-                    print(PROMPT + str(success))
-                elif statement == "drop table":
-                    success = dbms.drop_table(table["table_name"])
-                    print(PROMPT + str(success))
-                elif statement in ("explain", "describe", "desc"):
-                    table = dbms.explain_describe_desc(table["table_name"])
-                    print(PROMPT + str(table))
-                elif statement == "show tables":
-                    output = dbms.show_tables()
-                    print(PROMPT + output)
-                elif statement == "insert":
-                    result = dbms.insert(table, record)
-                    print(PROMPT + str(result))
-                elif statement == "delete":
-                    result, extra = dbms.delete(table["table_name"], where)
-                    print(PROMPT + str(result))
-                    if extra:
-                        print(PROMPT + str(extra))
-                elif statement == "select":
-                    output = dbms.select(tables, select_columns, where)
-                    print(PROMPT + output)
-            except (SyntaxError, NoSuchTable, DuplicateColumnDefError, DuplicatePrimaryKeyDefError, 
-                    ReferenceTypeError, ReferenceNonPrimaryKeyError, ReferenceColumnExistenceError, ReferenceTableExistenceError, 
-                    NonExistingColumnDefError, TableExistenceError, CharLengthError, DropReferencedTableError, 
-                    InsertTypeMismatchError, InsertColumnExistenceError, InsertColumnNonNullableError,
-                    InsertDuplicatePrimaryKeyError, InsertReferentialIntegrityError,
-                    SelectTableExistenceError, SelectColumnResolveError, 
-                    WhereIncomparableError, WhereTableNotSpecified, WhereColumnNotExist, WhereAmbiguousReference) as e:
+                outputs = execute_query(dbms, query)
+            except QUERY_ERRORS as e:
                 print(PROMPT + str(e))
                 break
+            if outputs is None:
+                exit = True  # end program only when exit query is entered
+                break
+            for output in outputs:
+                print(PROMPT + output)
+    dbms.close()
+    
+
+_parsers = threading.local()  # each thread has a parser of its own, as its transformer holds the query being parsed
+
+
+def build_parser():
+    """Builds a parser of the grammar with a SQLTransformer of its own, applied while parsing so no parse tree is built.
+
+    The parser is LALR, so the analysis of the grammar is cached on disk (`cache=True`) and loaded instead
+    of built by later runs.
+    """
+    with open('grammar.lark') as file:
+        return Lark(file.read(), start="command", lexer="basic", parser="lalr", cache=True, transformer=SQLTransformer())
+
+
+def load_parser():
+    """Returns the parser of this thread, which is built when it parses its first query."""
+    sql_parser = getattr(_parsers, "sql_parser", None)
+    if sql_parser is None:
+        sql_parser = _parsers.sql_parser = build_parser()
+    return sql_parser
+
+
+def execute_query(dbms: DBMS, query: str):
+    """Executes one query and returns the messages to output, or None for the exit query."""
+    start = time.perf_counter()
+    parsed_query = parse_query(load_parser(), query)
+    profile = None
+    if parsed_query[0] == "explain analyze" or parsed_query[0] == "select" and dbms.profile_hook is not None:
+        profile = Profile(query, parse_time=time.perf_counter() - start)
+    return execute_statement(dbms, parsed_query, profile)
+
+
+def execute_statement(dbms: DBMS, parsed_query: tuple, profile: Profile=None):
+    """Executes a query returned by `parse_query`, which can be executed again.
+
+    A select or explain analyze query is profiled in the given Profile, which holds the time spent parsing it.
+    """
+    statement, table, record, tables, select_columns, where, group_by, having = parsed_query
+    if statement == 'exit':
+        return None
+    if statement == "create table":
+        success = dbms.create_table(table)
+        return [str(success)]
+    elif statement == "drop table":
+        success = dbms.drop_table(table["table_name"])
+        return [str(success)]
+    elif statement == "create index":
+        success = dbms.create_index(table["table_name"], table["index_name"], table["column_name_list"])
+        return [str(success)]
+    elif statement == "drop index":
+        success = dbms.drop_index(table["table_name"], table["index_name"])
+        return [str(success)]
+    elif statement == "analyze table":
+        success = dbms.analyze_table(table["table_name"])
+        return [str(success)]
+    elif statement in ("explain", "describe", "desc"):
+        table = dbms.explain_describe_desc(table["table_name"])
+        return [str(table)]
+    elif statement == "show tables":
+        output = dbms.show_tables()
+        return [output]
+    elif statement == "insert":
+        result = dbms.insert(table, record[0]) if len(record) == 1 else dbms.insert_many(table, record)
+        return [str(result)]
+    elif statement == "load data":
+        result = dbms.load_data(table["table_name"], table["file_path"])
+        return [str(result)]
+    elif statement == "delete":
+        result, extra = dbms.delete(table["table_name"], where)
+        return [str(result), str(extra)] if extra else [str(result)]
+    elif statement == "select":
+        output = dbms.select(tables, select_columns, where, group_by, having, profile)
+        return [output]
+    elif statement == "explain analyze":
+        output = dbms.explain_analyze(tables, select_columns, where, group_by, having, profile)
+        return [output]
+    elif statement in ("begin", "commit", "rollback"):
+        result = getattr(dbms, statement)()
+        return [str(result)]
+    return []
             
 
-def parse_query_sequence(input_query_sequence: str):
+def log_profile(profile: Profile):
+    """Profile hook writing the profile of each select to standard error, apart from the query results."""
+    print(profile.summary(), file=sys.stderr)
+
+
+def parse_query_sequence(input_query_sequence: str, read_line=input):
     """Parses the input query sequence and returns a list of queries."""
     while True:
         input_query_sequence = input_query_sequence.rstrip()  # remove any trailing whitespaces after the semicolon
         if input_query_sequence.endswith(";"):  # end of query sequence
             break
         else:
-            input_query_sequence += " " + input()  # waits for any additional input until the semicolon is found
+            input_query_sequence += " " + read_line()  # waits for any additional input until the semicolon is found
     query_list = input_query_sequence.split(";")
     return [query.strip() + ';' for query in query_list if query.strip()]  # adds semicolon to each query and remove whitespaces
 
 
-def parse_query(sql_parser: Lark, sql_transformer, query):
+def parse_query(sql_parser: Lark, query):
     """Parses the query and returns the transformed parse tree."""
+    sql_parser.options.transformer.reset()
     try:
-        parsed = sql_parser.parse(query)
+        return sql_parser.parse(query)
     except:
         raise SyntaxError()
-    else:
-        transformed = sql_transformer.transform(parsed)
-        return transformed
 
                 
 
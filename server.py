@@ -0,0 +1,212 @@
+import argparse
+import asyncio
+import os
+import socket
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from dbms import DBMS
+from run import PROMPT, QUERY_ERRORS, execute_query, log_profile, parse_query_sequence
+
+
+PIPELINE_DEPTH = 64  # query sequences read ahead of the one being executed, per client
+SEND_CHUNK_SIZE = 65536  # bytes of a result written before waiting for the client to read them
+
+
+class Server:
+    """Serves clients connected to a socket, each on a worker thread with a session of its own.
+
+    The sessions share the DBMS's environment, DB handles and schemas. At most `workers` clients are
+    served at the same time, and the others wait for a worker to become free.
+    """
+    def __init__(self, dbms: DBMS, workers: int):
+        self.dbms = dbms
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="session")
+        self.connections = set()  # connections being served, shut down when the server stops
+        self.lock = threading.Lock()
+
+    def serve_forever(self, listener: socket.socket):
+        try:
+            while True:
+                connection, _ = listener.accept()
+                with self.lock:
+                    self.connections.add(connection)
+                self.pool.submit(self.serve_client, connection)
+        finally:
+            with self.lock:
+                for connection in self.connections:  # unblocks the sessions waiting for input
+                    try:
+                        connection.shutdown(socket.SHUT_RDWR)
+                    except OSError:
+                        pass
+            self.pool.shutdown(wait=True)
+
+    def serve_client(self, connection: socket.socket):
+        session = self.dbms.open_session()
+        try:
+            with connection.makefile("r", encoding="utf-8") as reader, connection.makefile("w", encoding="utf-8") as writer:
+                self.run_session(session, reader, writer)
+        except (EOFError, OSError):  # the client has disconnected
+            pass
+        except Exception:
+            traceback.print_exc()
+        finally:
+            session.close()  # an unfinished transaction is rolled back
+            with self.lock:
+                self.connections.discard(connection)
+            connection.close()
+
+    def run_session(self, session: DBMS, reader, writer):
+        """Reads queries from a client as run.py reads them from the terminal, and sends each result as soon as it is ready."""
+        def read_line():
+            line = reader.readline()
+            if not line:
+                raise EOFError()
+            return line
+
+        while True:
+            writer.write(PROMPT)
+            writer.flush()
+            for query in parse_query_sequence(read_line(), read_line):
+                try:
+                    outputs = execute_query(session, query)
+                except QUERY_ERRORS as e:
+                    writer.write(PROMPT + str(e) + "\n")
+                    break
+                if outputs is None:  # exit only ends this client's session
+                    return
+                for output in outputs:
+                    writer.write(PROMPT + output + "\n")
+                writer.flush()
+            writer.flush()
+
+
+class AsyncServer:
+    """Serves clients with asyncio: each connection is a task instead of a thread, and only the statements run on worker threads.
+
+    Clients may send many queries without waiting for their results (pipelining). They are executed one
+    after another on a session of the client's own, while more are read ahead, up to PIPELINE_DEPTH
+    sequences. Results are written as fast as the client reads them: large ones are sent in chunks, so a
+    slow client holds back its own queries and not the memory of the server.
+    """
+    def __init__(self, dbms: DBMS, workers: int):
+        self.dbms = dbms
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="statement")
+        self.clients = set()  # tasks serving a connection, cancelled when the server stops
+
+    async def serve_forever(self, listener: socket.socket):
+        server = await asyncio.start_server(self.serve_client, sock=listener)
+        try:
+            await server.serve_forever()
+        finally:
+            server.close()
+            for client in list(self.clients):
+                client.cancel()
+            await asyncio.gather(*self.clients, return_exceptions=True)
+            self.pool.shutdown(wait=True)
+
+    async def serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.clients.add(asyncio.current_task())
+        session = self.dbms.open_session()
+        query_lists = asyncio.Queue(maxsize=PIPELINE_DEPTH)
+        receiving = asyncio.create_task(self.receive_queries(reader, query_lists))
+        try:
+            await self.run_session(session, query_lists, writer)
+        except (ConnectionError, asyncio.CancelledError):  # the client has disconnected or the server stops
+            pass
+        except Exception:
+            traceback.print_exc()
+        finally:
+            receiving.cancel()
+            await asyncio.get_running_loop().run_in_executor(self.pool, session.close)  # rolls back an unfinished transaction
+            writer.close()
+            self.clients.discard(asyncio.current_task())
+
+    async def receive_queries(self, reader: asyncio.StreamReader, query_lists: asyncio.Queue):
+        """Split the input of a client into query sequences as soon as it arrives, then put None once it ends."""
+        try:
+            input_query_sequence = ""
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                input_query_sequence += " " + line.decode()
+                if input_query_sequence.rstrip().endswith(";"):
+                    await query_lists.put(parse_query_sequence(input_query_sequence))  # waits while too many are pending
+                    input_query_sequence = ""
+        finally:
+            await query_lists.put(None)
+
+    async def run_session(self, session: DBMS, query_lists: asyncio.Queue, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.send(writer, PROMPT)
+            query_list = await query_lists.get()
+            if query_list is None:
+                return
+            for query in query_list:
+                try:
+                    outputs = await loop.run_in_executor(self.pool, execute_query, session, query)
+                except QUERY_ERRORS as e:
+                    await self.send(writer, PROMPT + str(e) + "\n")
+                    break
+                if outputs is None:  # exit only ends this client's session
+                    return
+                for output in outputs:
+                    await self.send(writer, PROMPT + output + "\n")
+
+    async def send(self, writer: asyncio.StreamWriter, text: str):
+        data = text.encode()
+        for start in range(0, len(data), SEND_CHUNK_SIZE):
+            writer.write(data[start:start + SEND_CHUNK_SIZE])
+            await writer.drain()  # waits while the client is not reading
+
+
+def open_listener(host: str, port: int, socket_path: str=None) -> socket.socket:
+    """Listen on a Unix socket if a path is given, otherwise on a TCP port."""
+    if socket_path is None:
+        return socket.create_server((host, port))
+    if os.path.exists(socket_path):  # left by a server that did not stop cleanly
+        os.remove(socket_path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen()
+    return listener
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the database to many clients over a socket.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5433)
+    parser.add_argument("--socket", help="path of a Unix socket to listen on instead of the TCP port")
+    parser.add_argument("--workers", type=int, default=8, help="number of clients served at the same time, "
+                        "or with --asyncio, of statements executed at the same time")
+    parser.add_argument("--asyncio", action="store_true", help="serve every client from one event loop, with pipelined queries")
+    parser.add_argument("--nosync", action="store_true", help="commits do not wait for the disk")
+    parser.add_argument("--scan-workers", type=int, default=0, help="processes sharing the scan of a large table")
+    parser.add_argument("--vectorized", action="store_true", help="filter scanned records in NumPy batches, if NumPy is installed")
+    parser.add_argument("--profile", action="store_true", help="log the time each phase of every select takes to standard error")
+    parser.add_argument("--load-dir", help="directory clients may load data files from; without it, load data is not allowed")
+    args = parser.parse_args()
+
+    # clients must not read arbitrary files of the server, so they only load from --load-dir
+    dbms = DBMS(sync=not args.nosync, scan_workers=args.scan_workers, profile_hook=log_profile if args.profile else None,
+                vectorized=args.vectorized, allow_load=args.load_dir is not None, load_dir=args.load_dir)
+    listener = open_listener(args.host, args.port, args.socket)
+    try:
+        if args.asyncio:
+            asyncio.run(AsyncServer(dbms, args.workers).serve_forever(listener))
+        else:
+            Server(dbms, args.workers).serve_forever(listener)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        if args.socket is not None:
+            os.remove(args.socket)
+        dbms.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,10 @@ class SQLTransformer(Transformer):
     # bottom-up (depth-first)
     def __init__(self):
         super().__init__()
+        self.reset()
+        
+    def reset(self):
+        """Forget the previous query, so that one transformer can be reused for every query."""
         self.statement = str()
         self.table = {
             "table_name": str(),
@@ -14,16 +18,18 @@ class SQLTransformer(Transformer):
             "primary_key_list": list(),  # [(key1, key2), ...]
             "foreign_key_dict": dict()  # {referencing_column_name: (referenced_table_name, referenced_column_name))}
         }
-        self.record = list()  # values to insert
+        self.record = list()  # rows of values to insert
         self.tables = list()
-        self.select_columns = list()  # [(table_name, column_name), ...)] or '*
+        self.select_columns = list()  # [(table_name, column_name), ...)] or '*, with (function, table_name, column_name) for aggregates
         self.where = dict()  # [(table_name, column_name, operator, value), ...] up to 4 conditions
+        self.group_by = list()  # [(table_name, column_name), ...]
+        self.having = dict()  # same as where, with aggregates as operands
         
     # assumes the parse tree transforms only one query at a time
     def command(self, items):
         if items[0] == "exit":
             self.statement = items[0]
-        return self.statement, self.table, self.record, self.tables, self.select_columns, self.where
+        return self.statement, self.table, self.record, self.tables, self.select_columns, self.where, self.group_by, self.having
     
     def query_list(self, items):
         return items[0]
@@ -82,6 +88,26 @@ class SQLTransformer(Transformer):
         }
         return items
 
+    def create_index_query(self, items):
+        self.statement = f"{items[0].lower()} {items[1].lower()}"
+        self.table = {
+            "table_name": items[4],
+            "index_name": items[2],
+            "column_name_list": items[5]
+        }
+        return items
+    
+    def index_name(self, items) -> str:
+        return items[0].value.lower()
+    
+    def drop_index_query(self, items):
+        self.statement = f"{items[0].lower()} {items[1].lower()}"
+        self.table = {
+            "table_name": items[4],
+            "index_name": items[2]
+        }
+        return items
+
     def explain_query(self, items):
         self.statement = items[0].lower()
         self.table = {
@@ -89,6 +115,17 @@ class SQLTransformer(Transformer):
         }
         return items
 
+    def explain_analyze_query(self, items):
+        self.statement = f"{items[0].lower()} {items[1].lower()}"  # the select query is already transformed
+        return items
+
+    def analyze_table_query(self, items):
+        self.statement = f"{items[0].lower()} {items[1].lower()}"
+        self.table = {
+            "table_name": items[2]
+        }
+        return items
+
     def describe_query(self, items):
         self.statement = items[0].lower()
         self.table = {
@@ -114,7 +151,7 @@ class SQLTransformer(Transformer):
             "table_name": items[2],
             "column_name_list": items[3],
         }
-        self.record = items[5]
+        self.record = items[5:]  # one value_list per row
         return items
     
     def value_list(self, items):
@@ -131,6 +168,14 @@ class SQLTransformer(Transformer):
             value = None
         return value
     
+    def load_data_query(self, items):
+        self.statement = f"{items[0].lower()} {items[1].lower()}"
+        self.table = {
+            "table_name": items[4],
+            "file_path": items[2].value[1:-1]  # strip quotes
+        }
+        return items
+    
     def delete_query(self, items):
         self.statement = items[0].lower()
         self.table = {
@@ -144,14 +189,39 @@ class SQLTransformer(Transformer):
         self.select_columns = items[1]
         self.tables = items[2][0]
         self.where = items[2][1]
+        self.group_by = items[2][2] or []
+        self.having = items[2][3]
         return items
         
     def select_list(self, items):
         return items
     
+    def select_item(self, items):
+        return items[0]
+    
     def selected_column(self, items):
         return items[0], items[1]  # table_name, column_name
     
+    def aggregate_column(self, items):
+        return items[0]  # no AS
+    
+    def aggregate(self, items):
+        function, argument = items[0], items[2]  # items[1] == "(", items[3] == ")"
+        if argument is None:  # "*"
+            if function != "count":
+                raise ValueError(f"{function}(*)")  # reported as a syntax error
+            return function, None, None
+        return (function,) + argument  # function, table_name, column_name
+    
+    def aggregate_function(self, items):
+        return items[0].value.lower()
+    
+    def aggregate_argument(self, items):
+        return items[0] if items else None
+    
+    def column_reference(self, items):
+        return items[0], items[1]  # table_name, column_name
+    
     def table_expression(self, items):
         return items
     
@@ -167,6 +237,12 @@ class SQLTransformer(Transformer):
     def where_clause(self, items):
         return items[1]  # items[0] == "where"
     
+    def group_by_clause(self, items):
+        return items[2:]  # items[0] == "group", items[1] == "by"
+    
+    def having_clause(self, items):
+        return items[1]  # items[0] == "having"
+    
     def boolean_expr(self, items):
         if len(items) == 1:
             return {
@@ -215,6 +291,8 @@ class SQLTransformer(Transformer):
     
     def comp_operand(self, items):
         if len(items) == 1:
+            if isinstance(items[0], tuple):
+                return items[0]  # (function, table_name, column_name)
             return (items[0],)  # (comparable_value,)
         elif len(items) == 2:
             return (items[0], items[1])  # (table_name, column_name)
@@ -245,6 +323,21 @@ class SQLTransformer(Transformer):
         else:
             return "is", None
     
+    def begin_query(self, items):
+        self.statement = items[0].lower()
+        self.table = None
+        return items
+    
+    def commit_query(self, items):
+        self.statement = items[0].lower()
+        self.table = None
+        return items
+    
+    def rollback_query(self, items):
+        self.statement = items[0].lower()
+        self.table = None
+        return items
+    
     # not for project 1-2, 1-3
     def update_query(self, items):
         self.statement = items[0].lower()
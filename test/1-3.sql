@@ -176,5 +176,8 @@ select students.id, lectures.id, lectures.name, apply.apply_date from students,
 -- Using all operators and all tables:
 select students.id, lectures.id, lectures.name, apply.apply_date from students, lectures, apply where students.id = apply.s_id and lectures.id = apply.l_id and apply_date > '2023-05-20' and lectures.capacity < 40 and lectures.name is not null and students.name != 'John Doe';
 
-
-
+-- Listing a table twice (read once, unqualified columns are ambiguous):
+select * from lectures, lectures;
+select lectures.name from lectures, lectures where lectures.capacity >= 30;
+select name from lectures, lectures;
+select * from lectures, lectures where capacity >= 30;
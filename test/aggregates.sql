@@ -0,0 +1,43 @@
+/* Aggregates */
+create table account ( account_number char (10) not null, branch_name char (15), balance int, opened date,
+primary key (account_number) );
+
+create table branch ( branch_name char (15) not null, branch_city char (15),
+primary key (branch_name) );
+
+insert into branch values('Downtown', 'Brooklyn');
+insert into branch values('Perryridge', 'Horseneck');
+insert into branch values('Redwood', 'Palo Alto');
+insert into account values('A-101', 'Downtown', 500, '2023-01-05');
+insert into account values('A-102', 'Perryridge', 400, '2023-02-11');
+insert into account values('A-201', 'Perryridge', 900, null);
+insert into account values('A-215', 'Downtown', 700, '2023-04-20');
+insert into account values('A-222', 'Redwood', null, '2023-03-15');
+insert into account values('A-305', null, 350, '2023-05-02');
+
+-- Aggregates over a whole table (count of a column and the others skip nulls):
+select count(*), count(balance), sum(balance), min(balance), max(balance), avg(balance) from account;
+select min(account_number), max(opened), count(opened) from account;
+select count(*), sum(balance), min(balance) from account where balance > 1000;
+
+-- Grouped rows, in the order their groups are first read (null is a group of its own):
+select branch_name, count(*), sum(balance), avg(balance) from account group by branch_name;
+select branch_name, max(opened) from account where balance >= 400 group by branch_name;
+
+-- Grouping by columns of joined tables:
+select branch_city, count(*), max(balance) from account, branch where account.branch_name = branch.branch_name group by branch_city;
+
+-- Groups filtered by having, on aggregates or grouped columns:
+select branch_name, sum(balance) from account group by branch_name having sum(balance) > 1000;
+select branch_name, count(*) from account group by branch_name having count(*) = 1 and branch_name is not null;
+select branch_name from account group by branch_name having max(balance) > 600 or min(opened) < '2023-02-01';
+
+-- Columns neither grouped by nor aggregated, sums of non-int columns, and aggregates in where:
+select account_number, count(*) from account group by branch_name;
+select branch_name, balance from account group by branch_name;
+select sum(opened) from account;
+select avg(branch_name) from account group by branch_name;
+select account_number from account where count(*) > 1;
+
+drop table account;
+drop table branch;
@@ -0,0 +1,44 @@
+/* Indexes */
+create table account ( account_number char (10) not null, branch_name char (15), balance int, opened date,
+primary key (account_number) );
+
+insert into account values('A-101', 'Downtown', 500, '2023-01-05'), ('A-102', 'Perryridge', 400, '2023-02-11'), ('A-201', 'Brighton', 900, null);
+insert into account values('A-215', 'Mianus', 700, '2023-03-30'), ('A-217', 'Brighton', 750, '2023-04-02'), ('A-222', null, 700, '2023-04-02');
+
+-- Creating indexes on existing records:
+create index account_branch on account (branch_name);
+create index account_balance_opened on account (balance, opened);
+
+-- Errors creating an index:
+create index account_branch on account (balance);
+create index account_city on account (branch_city);
+create index account_city on accounts (branch_name);
+
+-- Conditions on the first columns of an index read the index, with the other conditions checked on each record:
+explain analyze select * from account where branch_name = 'Brighton' and balance > 800;
+select * from account where branch_name = 'Brighton' and balance > 800;
+select * from account where branch_name = 'Brighton';
+select * from account where balance = 700 and opened >= '2023-04-01';
+
+-- A null in a later indexed column does not hide a record from ranges over the columns before it:
+explain analyze select * from account where balance >= 700 and branch_name != 'Mianus';
+select * from account where balance >= 700 and branch_name != 'Mianus';
+
+-- Null values are not indexed, but are still found by a full scan:
+select * from account where branch_name is null;
+
+-- The indexes follow inserts and deletes:
+insert into account values('A-305', 'Brighton', 350, '2023-05-19');
+delete from account where branch_name = 'Brighton' and balance > 800;
+select * from account where branch_name = 'Brighton';
+select * from account where balance = 350;
+
+-- Dropping an index, after which the same conditions read the whole table:
+drop index account_branch on account;
+explain analyze select * from account where branch_name = 'Brighton';
+select * from account where branch_name = 'Brighton';
+drop index account_branch on account;
+drop index account_balance_opened on accounts;
+
+-- Dropping the table drops its remaining indexes:
+drop table account;
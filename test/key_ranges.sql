@@ -0,0 +1,51 @@
+/* Primary key lookups and ranges */
+create table lectures ( id int not null, name char (20), capacity int,
+primary key (id) );
+
+create table account ( account_number char (10) not null, branch_name char (15), balance int,
+primary key (account_number) );
+
+create table depositor ( customer_name char (15) not null, account_number char (10) not null, since date not null,
+primary key (customer_name, since) );
+
+insert into lectures values(1, 'DB', 30), (2, 'OS', 25), (10, 'Compilers', 40), (11, 'Networks', 45), (12, 'Graphics', 20), (100, 'Algorithms', 60);
+insert into account values('A-101', 'Downtown', 500), ('A-102', 'Perryridge', 400), ('A-201', 'Brighton', 900), ('A-215', 'Mianus', 700), ('A-217', 'Brighton', 750);
+insert into depositor values('Hayes', 'A-102', '2022-01-05'), ('Johnson', 'A-101', '2021-03-01'), ('Johnson', 'A-201', '2023-07-14'), ('Jones', 'A-217', '2020-11-30'), ('Smith', 'A-215', '2019-05-02');
+
+-- Equality on the whole primary key is a single lookup, whatever the other conditions are:
+explain analyze select * from lectures where id = 1 and name = 'DB';
+select * from lectures where id = 1 and name = 'DB';
+select * from lectures where id = 1 and name = 'OS';
+explain analyze select * from account where account_number = 'A-101' and branch_name = 'Downtown';
+select * from account where account_number = 'A-101' and branch_name = 'Downtown';
+select * from account where account_number = 'A-999';
+
+-- Bounds on the primary key read only the keys in range, in key order (ints sort numerically, not as text):
+explain analyze select * from lectures where id > 10 and name != 'x';
+select * from lectures where id > 10 and name != 'x';
+select * from lectures where id >= 2 and id < 12;
+select * from lectures where 12 >= id and capacity > 20;
+select * from lectures where id > 100;
+select * from account where account_number >= 'A-2' and balance > 700;
+
+-- Equality on the leading columns of a composite primary key, with bounds on the next one:
+explain analyze select * from depositor where customer_name = 'Johnson' and since > '2022-01-01';
+select * from depositor where customer_name = 'Johnson' and since > '2022-01-01';
+select * from depositor where customer_name = 'Johnson';
+select * from depositor where customer_name = 'Hayes' and since = '2022-01-05';
+
+-- Conditions on a later column alone, or with or, still read the whole table:
+explain analyze select * from depositor where since < '2021-01-01';
+select * from depositor where since < '2021-01-01';
+select * from lectures where id = 1 or id = 100;
+
+-- Delete reads its table the same way:
+delete from lectures where id = 12 and capacity = 20;
+delete from lectures where id >= 10 and id <= 11;
+select * from lectures;
+delete from depositor where customer_name = 'Johnson' and since < '2022-01-01';
+select * from depositor;
+
+drop table depositor;
+drop table account;
+drop table lectures;
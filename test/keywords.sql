@@ -0,0 +1,52 @@
+/* Keywords as names */
+-- Keywords added for indexes, LOAD DATA, aggregates, GROUP BY, transactions and ANALYZE are still valid names:
+create table count (
+count int not null,
+sum int,
+min char (10),
+max date,
+data char (10),
+index int,
+primary key (count)
+);
+
+create table load ( begin int, commit char (10), rollback int,
+foreign key (begin) references count (count)
+);
+
+insert into count values(1, 10, 'a', '2023-05-01', 'x', 1);
+insert into count values(2, 20, 'b', '2023-05-02', 'x', 1);
+insert into count values(3, 30, null, null, 'y', null);
+insert into load values(1, 'yes', 0);
+insert into load values(2, 'no', 1);
+
+-- Selecting columns named like aggregates:
+select count, sum, min, max from count;
+select count.count, count.index from count where index = 1;
+select count, data from count where max is null;
+
+-- Aggregates over columns named like aggregates:
+select data, count(*), sum(sum), min(min), max(count) from count group by data;
+select data, count(count) from count group by data having count(count) > 1;
+select data from count where count > 1 group by data having sum(sum) >= 30;
+
+-- Joining tables named like keywords:
+select count.data, load.commit from count, load where count.count = load.begin and rollback = 0;
+
+-- Indexes named like keywords:
+create index on on count (data);
+select count from count where data = 'x';
+explain count;
+drop index on on count;
+
+-- Other statements on tables named like keywords:
+analyze table load;
+select * from load;
+delete from load where commit = 'no';
+select * from load;
+
+-- Transactions still begin and end as before:
+begin;
+delete from load;
+rollback;
+select * from load;
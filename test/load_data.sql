@@ -0,0 +1,29 @@
+/* Load data */
+-- The files are loaded from test/, so run from the repository root:
+create table branch ( branch_name char (15) not null, branch_city char (15), assets int,
+primary key (branch_name) );
+
+create table account ( account_number char (10) not null, branch_name char (15), balance int, opened date,
+primary key (account_number),
+foreign key (branch_name) references branch (branch_name) );
+
+-- Loading a CSV file whose first line holds the column names (empty fields and null are loaded as null):
+load data 'test/branches.csv' into branch;
+select * from branch;
+
+-- Loading a TSV file without a header line:
+load data 'test/accounts.tsv' into account;
+select * from account;
+select account_number, balance from account where opened is null;
+
+-- Loaded rows are checked like inserted ones (a value of the wrong type, a missing referenced record):
+load data 'test/bad_accounts.csv' into account;
+load data 'test/orphan_accounts.csv' into account;
+select * from account where balance < 200;
+
+-- Loading a file that does not exist, or into a table that does not exist:
+load data 'test/no_such_file.csv' into account;
+load data 'test/branches.csv' into branches;
+
+drop table account;
+drop table branch;
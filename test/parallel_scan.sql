@@ -0,0 +1,42 @@
+/* Parallel scan */
+-- Run with python run.py --scan-workers 4; each result must be the same as without the option.
+-- Tables whose file is smaller than PARALLEL_SCAN_MIN_BYTES are still read by one cursor, so only larger ones are shared by the workers.
+create table account ( account_number char (10) not null, branch_name char (15), balance int, opened date, note char (10),
+primary key (account_number) );
+
+create table branch ( branch_name char (15) not null, branch_city char (15),
+primary key (branch_name) );
+
+insert into branch values('Downtown', 'Brooklyn');
+insert into branch values('Perryridge', 'Horseneck');
+insert into account values('A-101', 'Downtown', 500, '2023-01-05', 'a');
+insert into account values('A-102', 'Perryridge', 400, '2023-02-11', '2023-03-01');
+insert into account values('A-201', 'Perryridge', 900, null, null);
+insert into account values('A-215', 'Downtown', 700, '2023-04-20', 'b');
+insert into account values('A-305', 'Brighton', 350, '2023-05-02', null);
+
+-- Whole tables scanned with conditions, in primary key order:
+select * from account;
+select account_number, balance from account where balance > 400 and opened is not null;
+select account_number from account where branch_name = 'Perryridge' or balance < 400;
+select account_number from account where note is null;
+select account_number from account where opened > '2023-02-01';
+
+-- Values that cannot be compared fail the whole scan:
+select account_number from account where note > '2023-01-01';
+select account_number from account where balance = 'Downtown';
+
+-- Joined tables and aggregates over scanned tables:
+select account_number, branch_city from account, branch where account.branch_name = branch.branch_name;
+select branch_name, count(*), sum(balance) from account group by branch_name;
+
+-- Within BEGIN, the transaction's own writes are seen:
+begin;
+insert into account values('A-401', 'Downtown', 650, '2023-06-01', null);
+delete from account where balance < 400;
+select account_number, balance from account where balance > 600;
+rollback;
+select account_number, balance from account where balance > 600;
+
+drop table account;
+drop table branch;
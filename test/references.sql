@@ -0,0 +1,53 @@
+/* Foreign key references */
+create table branch ( branch_name char (15) not null, branch_city char (15),
+primary key (branch_name) );
+
+create table account ( account_number char (10) not null, branch_name char (15),
+primary key (account_number),
+foreign key (branch_name) references branch (branch_name) );
+
+create table depositor ( customer_name char (15) not null, account_number char (10) not null,
+primary key (customer_name, account_number),
+foreign key (account_number) references account (account_number) );
+
+create table loan ( loan_number char (10) not null, account_number char (10),
+foreign key (account_number) references depositor (account_number) );
+
+insert into branch values('Brighton', 'Brooklyn'), ('Downtown', 'Brooklyn'), ('Mianus', 'Horseneck');
+insert into account values('A-101', 'Downtown'), ('A-201', 'Brighton'), ('A-217', 'Brighton');
+
+-- Inserting records that reference missing records:
+insert into account values('A-215', 'Perryridge');
+insert into depositor values('Hayes', 'A-999');
+
+-- Deleting referenced records fails, deleting the others succeeds:
+insert into depositor values('Hayes', 'A-101'), ('Johnson', 'A-101'), ('Jones', 'A-217');
+delete from branch;
+select * from branch;
+delete from account;
+select * from account;
+delete from branch where branch_name = 'Brighton';
+
+-- Records of a composite primary key holding the same referenced value:
+insert into loan values('L-11', 'A-101'), ('L-14', 'A-217');
+delete from depositor where customer_name = 'Jones';
+delete from loan where loan_number = 'L-14';
+delete from depositor where customer_name = 'Jones';
+delete from depositor where customer_name = 'Hayes';
+delete from depositor where customer_name = 'Johnson';
+delete from loan;
+delete from depositor where customer_name = 'Hayes';
+select * from depositor;
+
+-- The references go with the referencing records:
+delete from account where account_number = 'A-217';
+delete from branch where branch_name = 'Brighton';
+select * from account;
+select * from branch;
+
+-- Referenced tables are dropped after the tables referencing them:
+drop table account;
+drop table loan;
+drop table depositor;
+drop table account;
+drop table branch;
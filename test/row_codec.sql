@@ -0,0 +1,28 @@
+/* Row codec */
+create table customer ( customer_id int not null, customer_name char (10), customer_street char (30), birth date, credit int,
+primary key (customer_id) );
+
+-- Values at the limits of their types:
+insert into customer values(1, 'Jones', 'Main', '1990-01-31', 9223372036854775807);
+insert into customer values(2, 'Smith', 'North', '2000-12-01', 0);
+insert into customer values(0, 'Hayes', '', '1999-02-28', 0);
+insert into customer values(3, 'Curry', 'Walnut Street, Rye, New York 1', '2023-05-20', 100);
+
+-- Char values longer than their column are truncated:
+insert into customer values(4, 'Lindsay-Brown', 'Park', '2021-07-04', 7);
+
+-- Null in every nullable column:
+insert into customer values(5, null, null, null, null);
+
+-- Values that do not fit their column:
+insert into customer values(6, 'Turner', 'Putnam', '2021-07-04', 9223372036854775808);
+insert into customer values(7, 'Glenn', 'Sand Hill', 20210704, 1);
+insert into customer values(8, 12, 'Sand Hill', '2021-07-04', 1);
+
+-- Every column, then a few of them, decoded from the same records:
+select * from customer;
+select customer_name, credit from customer where credit > 0;
+select customer_id from customer where customer_name is null and birth is null;
+select customer_id, customer_street from customer where customer_street = '';
+
+drop table customer;
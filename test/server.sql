@@ -0,0 +1,23 @@
+/* Server */
+-- Sent by a client of a server started from the repository root with python server.py --load-dir test:
+-- Without --load-dir, every load data of a client fails with: Load data has failed: loading files is not allowed
+create table branch ( branch_name char (15) not null, branch_city char (15), assets int,
+primary key (branch_name) );
+
+-- Paths are relative to the load directory:
+load data 'branches.csv' into branch;
+select * from branch;
+
+-- Paths leading outside of the load directory are rejected:
+load data '../README.md' into branch;
+load data '/etc/passwd' into branch;
+load data 'test/branches.csv' into branch;
+
+-- Transactions are kept per client, and exit rolls back an unfinished one:
+begin;
+delete from branch where assets < 2000000;
+select branch_name from branch;
+rollback;
+select branch_name from branch;
+
+drop table branch;
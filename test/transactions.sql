@@ -0,0 +1,56 @@
+/* Transactions */
+create table branch ( branch_name char (15) not null, assets int,
+primary key (branch_name) );
+
+create table account ( account_number char (10) not null, branch_name char (15), balance int,
+primary key (account_number),
+foreign key (branch_name) references branch (branch_name) );
+
+insert into branch values('Downtown', 9000);
+insert into branch values('Perryridge', 1700);
+insert into branch values('Redwood', 2100);
+
+-- Changes made within a committed transaction are kept:
+begin;
+insert into account values('A-101', 'Downtown', 500);
+insert into account values('A-102', 'Perryridge', 400);
+delete from branch where branch_name = 'Redwood';
+commit;
+select * from account;
+select * from branch;
+
+-- Changes made within a rolled back transaction are undone:
+begin;
+insert into account values('A-201', 'Perryridge', 900);
+delete from account where balance < 450;
+select * from account;
+rollback;
+select * from account;
+
+-- Tables created or dropped within a rolled back transaction are restored:
+begin;
+create table loan ( loan_number char (10) not null, amount int,
+primary key (loan_number) );
+insert into loan values('L-11', 900);
+drop table account;
+show tables;
+rollback;
+show tables;
+select * from account;
+
+-- Statements that fail within a transaction do not end it:
+begin;
+insert into account values('A-301', 'Brighton', 100);
+insert into account values('A-302', 'Downtown', 100);
+commit;
+select * from account;
+
+-- Beginning a transaction twice, or ending one that has not begun:
+begin;
+begin;
+rollback;
+commit;
+rollback;
+
+drop table account;
+drop table branch;
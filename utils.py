@@ -50,36 +50,57 @@ null_op_map = {
 # --------------------------------- data type -------------------------------- #
 
 DATE_PATTERN = r"(\d{4})-(\d{2})-(\d{2})"
+INT_PATTERN = r"[+-]?\d+"
+INT_MIN, INT_MAX = -2**63, 2**63 - 1  # int values are stored as int64
 
 def eval_char_max_len(data_type):
     """Return the length of char type."""
     return eval(data_type[5:-1])  # char($num) -> $num
     
+def cast_value(data_type, text):
+    """Convert a field of a loaded file to the value it would have in an INSERT statement."""
+    if text == "" or text.lower() == "null":
+        return None
+    if data_type == "int" and re.fullmatch(INT_PATTERN, text):
+        return int(text)
+    return text
+    
 def is_valid_type(valid_type, value):
     if value == None:
         return True
     try:
         if valid_type == "int":
-            return isinstance(value, int)
+            return isinstance(value, int) and INT_MIN <= value <= INT_MAX
         elif valid_type.startswith("char"):
             return isinstance(value, str) and not value.isdigit()  # must check if value is string first to avoid AttributeError
         elif valid_type == "date":
-            return re.match(DATE_PATTERN, value)
+            return isinstance(value, str) and re.fullmatch(DATE_PATTERN, value)  # dates are stored as yyyymmdd
     except ValueError:
         return False
 
+def infer_type(value):
+    """Infer the data type of a value the way it is compared in where clauses."""
+    if value == None:
+        return None
+    try:
+        int(value)
+        return "int"
+    except ValueError:
+        if re.match(DATE_PATTERN, value):
+            return "date"
+        else:
+            return "char"
+
+def column_value_types(data_type):
+    """Return the types `infer_type` may give for values stored in a column of `data_type`."""
+    if data_type == "int":
+        return {"int"}
+    elif data_type == "date":
+        return {"date"}
+    else:  # char values can never be all digits, but may look like dates
+        return {"char", "date"}
+
 def is_comparable(a, b):
-    def infer_type(value):
-        if value == None:
-            return None
-        try:
-            int(value)
-            return "int"
-        except ValueError:
-            if re.match(DATE_PATTERN, value):
-                return "date"
-            else:
-                return "char"
     a_type = infer_type(a)
     b_type = infer_type(b)
     if a_type == None or b_type == None:
@@ -0,0 +1,231 @@
+import itertools
+import re
+from typing import Callable, Iterable, Iterator, List, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional: without it, every table is filtered by the row path
+    np = None
+
+from db_model import Table, DB, RowCodec
+from condition import resolve_column, FLIPPED_OPS
+from utils import *
+
+
+# The vectorized filter decodes the records of a scan in batches into one NumPy array per column a
+# condition reads, and evaluates the condition on whole arrays. Each condition yields a (true, unknown)
+# pair of boolean masks, false being neither, combined the way `and_`, `or_` and `not_` in utils.py
+# combine True, False and UNKNOWN. Only the records that satisfy every condition are decoded into rows.
+#
+# Conditions the masks cannot express are compiled to None and the scan keeps the row path. A batch holding
+# values that the row path checks one by one, such as date-like values of a char column compared with a
+# char constant, is filtered by the row path, so it raises the same errors.
+
+BATCH_SIZE = 4096  # records decoded and filtered together
+
+BatchPredicate = Callable[["RecordBatch"], Tuple["np.ndarray", "np.ndarray"]]
+
+
+def is_available() -> bool:
+    return np is not None
+
+
+class RecordBatch:
+    """Encoded records of a table, decoded column by column into NumPy arrays when a condition reads them.
+
+    `int` columns are int64 arrays and `date` columns are their stored yyyymmdd as uint32, which order as
+    the dates do. `char` columns are object arrays of str. Each column comes with a mask of its nulls,
+    whose values are 0 or "".
+    """
+    def __init__(self, codec: RowCodec, encoded_records: List[bytes]):
+        self.codec = codec
+        self.encoded_records = encoded_records
+        fixed_size = codec.fixed.size
+        fields = b"".join(encoded[:fixed_size] for encoded in encoded_records)
+        self.fields = np.frombuffer(fields, dtype=fixed_dtype(codec))
+        self.columns = {}  # key: column position, value: (values, null mask)
+        self.comparable = {}  # key: (column position, constant), value: whether every value of the column compares with it
+
+    def __len__(self):
+        return len(self.encoded_records)
+
+    def column(self, position: int) -> Tuple["np.ndarray", "np.ndarray"]:
+        if position not in self.columns:
+            nulls = (self.fields["nulls"][:, position // 8] >> (position % 8) & 1).astype(bool)
+            values = self.fields[f"c{position}"]
+            if self.codec.kinds[position] == "char":  # the field is the length of the value, which follows the previous char values
+                offsets = np.full(len(self), self.codec.fixed.size, dtype=np.int64)
+                for char_position in self.codec.char_positions:
+                    if char_position == position:
+                        break
+                    offsets += self.fields[f"c{char_position}"]
+                values = np.array([encoded[offset:offset + length].decode() for encoded, offset, length
+                                   in zip(self.encoded_records, offsets.tolist(), values.tolist())], dtype=object)
+            self.columns[position] = values, nulls
+        return self.columns[position]
+
+    def is_comparable(self, position: int, constant) -> bool:
+        """Whether every value of a column is comparable with a constant, as the row path checks for each value."""
+        if (position, constant) not in self.comparable:
+            values, nulls = self.column(position)
+            self.comparable[position, constant] = all(is_comparable(value, constant) for value in set(values[~nulls].tolist()))
+        return self.comparable[position, constant]
+
+
+def fixed_dtype(codec: RowCodec) -> "np.dtype":
+    """NumPy dtype of the null bitmap and fixed-width fields that start each record encoded by a RowCodec."""
+    fields = [("nulls", "u1", (codec.bitmap_size,))]
+    for position, kind in enumerate(codec.kinds):
+        fields.append((f"c{position}", "<i8" if kind == "int" else "<u4"))
+    return np.dtype(fields)
+
+
+# -------------------------------- compilation ------------------------------- #
+
+def compile_batch_predicate(conjuncts: List[dict], table: Table, table_list: List[Table]) -> Callable[[RecordBatch], "np.ndarray"]:
+    """Compile the conditions on one table into a function returning the mask of the records of a batch that satisfy all of them.
+
+    Returns None if a condition cannot be vectorized. The function returns None for a batch that
+    must be filtered by the row path instead.
+    """
+    if np is None:
+        return None
+    predicates = [_compile(conjunct, table, table_list) for conjunct in conjuncts]
+    if not predicates or None in predicates:
+        return None
+
+    def batch_predicate(batch):
+        mask = np.ones(len(batch), dtype=bool)
+        for predicate in predicates:
+            result = predicate(batch)
+            if result is None:
+                return None
+            mask &= result[0]
+        return mask
+    return batch_predicate
+
+
+def _compile(condition: dict, table: Table, table_list: List[Table]) -> BatchPredicate:
+    op = condition["op"]
+    if op in comparison_op_map:
+        return _compile_comparison(condition, table, table_list)
+
+    elif op in null_op_map:
+        position = _operand(condition["left_operand"], table, table_list)[0]
+        def predicate(batch):
+            nulls = batch.column(position)[1]
+            return (nulls if op == "is" else ~nulls), np.zeros(len(batch), dtype=bool)
+        return predicate
+
+    elif op == "not":
+        boolean_test = _compile(condition["boolean_test"], table, table_list)
+        if boolean_test is None:
+            return None
+        def predicate(batch):
+            result = boolean_test(batch)
+            if result is None:
+                return None
+            true, unknown = result
+            return ~true & ~unknown, unknown
+        return predicate
+
+    elif op in ("and", "or"):
+        operands = condition["boolean_factors"] if op == "and" else condition["boolean_terms"]
+        predicates = [_compile(operand, table, table_list) for operand in operands]
+        if None in predicates:
+            return None
+        def predicate(batch):
+            results = [operand_predicate(batch) for operand_predicate in predicates]
+            if None in results:
+                return None
+            trues = np.array([true for true, _ in results])
+            unknowns = np.array([unknown for _, unknown in results])
+            any_unknown = unknowns.any(axis=0)
+            if op == "and":  # as `and_`: with an UNKNOWN, UNKNOWN only if another value is False, otherwise False
+                return trues.all(axis=0), any_unknown & (~trues & ~unknowns).any(axis=0)
+            any_true = trues.any(axis=0)  # as `or_`
+            return any_true, any_unknown & ~any_true
+        return predicate
+
+    else:  # None
+        remaining_condition = list(condition.values())[-1]
+        if remaining_condition is None:
+            return None
+        return _compile(remaining_condition, table, table_list)
+
+
+def _operand(operand: tuple, table: Table, table_list: List[Table]) -> Tuple[int, object, Set[str]]:
+    """Return (position in the table, constant, possible value types) of an operand; position is None for constants."""
+    if len(operand) == 1:  # comparable_value
+        return None, operand[0], {infer_type(operand[0])}
+    table_name, column_name = operand
+    resolve_column(table_name, column_name, table_list)
+    return list(table.columns).index(column_name), None, column_value_types(table.columns[column_name])
+
+
+def _compile_comparison(condition: dict, table: Table, table_list: List[Table]) -> BatchPredicate:
+    op, left_operand, right_operand = condition["op"], condition["left_operand"], condition["right_operand"]
+    if len(left_operand) == 1 and len(right_operand) == 2:  # constant op column
+        op, left_operand, right_operand = FLIPPED_OPS[op], right_operand, left_operand
+    left_position, _, left_types = _operand(left_operand, table, table_list)
+    right_position, constant, right_types = _operand(right_operand, table, table_list)
+    if left_position is None or None in left_types | right_types or not left_types & right_types:
+        return None
+    check_values = len(left_types | right_types) > 1
+    compare = comparison_op_map[op]
+    kind = stored_kind(table.columns[left_operand[1]])
+
+    if right_position is not None:  # column op column
+        if check_values or kind != stored_kind(table.columns[right_operand[1]]):
+            return None
+        def predicate(batch):
+            left_values, left_nulls = batch.column(left_position)
+            right_values, right_nulls = batch.column(right_position)
+            unknown = left_nulls | right_nulls
+            return compare(left_values, right_values) & ~unknown, unknown
+        return predicate
+
+    value = constant  # compared with the values of the column's array
+    if kind == "int":
+        if not isinstance(constant, int) or not INT_MIN <= constant <= INT_MAX:  # e.g. a negative number, which stays a str
+            return None
+    elif kind == "date":
+        if not re.fullmatch(DATE_PATTERN, constant):
+            return None
+        value = int(constant[0:4]) * 10000 + int(constant[5:7]) * 100 + int(constant[8:10])
+    def predicate(batch):
+        values, nulls = batch.column(left_position)
+        if check_values and not batch.is_comparable(left_position, constant):
+            return None
+        return compare(values, value) & ~nulls, nulls
+    return predicate
+
+
+def stored_kind(data_type: str) -> str:
+    """Return how a RowCodec stores the values of a column: as "int", "date" or "char"."""
+    return data_type if data_type in ("int", "date") else "char"
+
+
+# --------------------------------- execution -------------------------------- #
+
+def filter_batches(table_db: DB, records: Iterable[Tuple[bytes, bytes]], batch_predicate: Callable[[RecordBatch], "np.ndarray"],
+                   row_predicate: Callable, positions: Set[int]=None) -> Iterator[tuple]:
+    """Yield the rows of the (key, encoded record) pairs that satisfy the conditions, as `scan` does.
+
+    The records are filtered BATCH_SIZE at a time by the batch predicate, or by the row predicate for
+    the batches it cannot filter.
+    """
+    records = iter(records)
+    while True:
+        encoded_records = [encoded for _, encoded in itertools.islice(records, BATCH_SIZE)]
+        if not encoded_records:
+            return
+        mask = batch_predicate(RecordBatch(table_db.codec, encoded_records))
+        if mask is None:
+            for encoded in encoded_records:
+                row = table_db.decode_row(encoded, positions)
+                if row_predicate(row) == True:
+                    yield row
+        else:
+            for i in np.flatnonzero(mask).tolist():
+                yield table_db.decode_row(encoded_records[i], positions)